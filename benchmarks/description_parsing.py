@@ -0,0 +1,132 @@
+"""
+Compare l'analyse des descriptions CY avant et après le découpage en une seule passe
+
+Un corpus synthétique de descriptions (cours, rattrapages, entités HTML, variantes de <br>)
+est analysé avec l'ancienne implémentation, recopiée ci-dessous, puis avec celle de
+src.calendar_converter. Le cache de parse_description est contourné pour mesurer l'analyse
+elle-même. Le script se termine en erreur si les deux implémentations divergent.
+
+Usage: python benchmarks/description_parsing.py [--count 100000] [--runs 3]
+"""
+import argparse
+import html
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.calendar_converter import extract_clean_lines, parse_description, parse_regular_description
+
+BREAKS = ['<br />', '<br/>', '<br>', '<br />\r\n', '<br/>\n', '<br /><br />']
+EVENT_TYPES = ['CM', 'TD', 'TP', 'Examen', 'Rattrapage']
+GROUPS = ['ING1 GI GR1', 'ING1 GI GR2', 'ING2 GM GR3', 'PREPA MP GR1']
+SUBJECTS = ['Analyse TD [ANA1]', 'Algorithmique CM', 'Physique TP [PHY2]', 'Anglais', 'Probabilit&#233;s']
+ROOMS = ['SALLE FER 101', 'CAU 201 &amp; Amphi', 'Amphi Turing', 'TUR 012', 'CON 3', 'A 104']
+PROFESSORS = ['DUPONT Jean', 'Martin &#201;mile', 'O&#39;NEIL Sarah', '']
+EXAM_SUBJECTS = ['Rattrapage Partiel Analyse', 'Matière : Physique', 'Algorithmique avancée']
+
+def old_extract_clean_lines(description):
+    description = re.sub(r'<br\s*\/?>(\s*<br\s*\/?>)*', '|LINEBREAK|', description)
+    description = re.sub(r'<[^>]*>', '', description)
+    description = html.unescape(description)
+    lines = description.split('|LINEBREAK|')
+    return [line.strip() for line in lines if line.strip()]
+
+def old_parse_rattrapage_description(lines):
+    event_type = lines[0]
+    groups = []
+    room_index = -1
+    for i, line in enumerate(lines[1:], 1):
+        if "SALLE" in line or "Amphi" in line or any(bldg in line for bldg in ["FER", "CAU", "TUR", "CON"]):
+            room_index = i
+            location = line
+            break
+        else:
+            groups.append(line)
+    if room_index == -1:
+        if len(lines) > 2:
+            location = lines[2]
+            room_index = 2
+        else:
+            location = ""
+            room_index = len(lines)
+    group = ", ".join(groups)
+    professor = ""
+    exam_subject = ""
+    remaining_lines = lines[room_index+1:] if room_index < len(lines) else []
+    if remaining_lines:
+        for line in remaining_lines:
+            if "Rattrapage Partiel" in line or "Matière" in line:
+                exam_subject = line
+            elif len(line.split()) <= 4:
+                professor = line
+    if not exam_subject and remaining_lines and not professor:
+        exam_subject = remaining_lines[0]
+    elif not exam_subject and remaining_lines and professor and len(remaining_lines) > 1:
+        exam_subject = remaining_lines[1]
+    return event_type, group, "", location, professor, True, exam_subject, ""
+
+def old_parse_description(description):
+    lines = old_extract_clean_lines(description)
+    if not lines:
+        return "", "", "", "", "", False, "", ""
+    event_type = lines[0]
+    if "rattrapage" in event_type.lower() or "examen" in event_type.lower():
+        return old_parse_rattrapage_description(lines)
+    return parse_regular_description(lines)
+
+def make_description(rng):
+    event_type = rng.choice(EVENT_TYPES)
+    if event_type in ('Examen', 'Rattrapage'):
+        fields = [event_type] + rng.sample(GROUPS, rng.randint(1, 3)) + [rng.choice(ROOMS)]
+        fields += [rng.choice(PROFESSORS), rng.choice(EXAM_SUBJECTS)]
+    else:
+        fields = [event_type, rng.choice(GROUPS), rng.choice(SUBJECTS), rng.choice(ROOMS), rng.choice(PROFESSORS)]
+    if rng.random() < 0.1:
+        fields[0] = f"<b>{fields[0]}</b>"
+    description = ''
+    for field in fields:
+        description += field + rng.choice(BREAKS)
+    return description[:-len(BREAKS[0])] if rng.random() < 0.5 else description
+
+def best_time(function, corpus, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for description in corpus:
+            function(description)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [make_description(rng) for _ in range(args.count)]
+    new_parse_description = parse_description.__wrapped__
+
+    mismatches = [d for d in corpus if old_parse_description(d) != new_parse_description(d)
+                  or old_extract_clean_lines(d) != extract_clean_lines(d)]
+    if mismatches:
+        print(f"✗ {len(mismatches)} descriptions analysées différemment, par exemple: {mismatches[0]!r}")
+        sys.exit(1)
+
+    print(f"{args.count} descriptions, meilleur temps sur {args.runs} exécutions")
+    print(f"{'fonction':<22} {'avant (s)':>10} {'après (s)':>10} {'gain':>7}")
+    for name, old, new in [
+        ('extract_clean_lines', old_extract_clean_lines, extract_clean_lines),
+        ('parse_description', old_parse_description, new_parse_description),
+    ]:
+        old_time = best_time(old, corpus, args.runs)
+        new_time = best_time(new, corpus, args.runs)
+        print(f"{name:<22} {old_time:>10.3f} {new_time:>10.3f} {old_time / new_time:>6.2f}x")
+
+if __name__ == "__main__":
+    main()
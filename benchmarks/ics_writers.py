@@ -0,0 +1,124 @@
+"""
+Compare l'écriture directe des VEVENT (src.ics_writer) à l'implémentation de référence icalendar
+
+Les deux écritures d'un même jeu d'événements synthétiques (accents, caractères à échapper,
+lignes longues à replier) sont relues avec icalendar et comparées propriété par propriété,
+puis chronométrées. Le script se termine en erreur si les calendriers diffèrent.
+
+Usage: python benchmarks/ics_writers.py [--count 20000] [--runs 3]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytz
+from icalendar import Calendar
+from src.calendar_converter import build_ics_event
+from src.course_event import CourseEvent
+from src.ics_writer import ICS_FOOTER, ICS_HEADER, format_vevent
+
+COMPARED_PROPERTIES = ['SUMMARY', 'DESCRIPTION', 'LOCATION', 'UID', 'X-CYCALENDAR-FINGERPRINT', 'X-EVENT-TYPE',
+                       'X-ORIGINAL-BG-COLOR']
+
+SUBJECTS = ['Analyse', 'Probabilités et statistiques appliquées à l\'ingénierie des systèmes', 'Anglais; oral',
+            'Réseaux, protocoles\\ et sécurité', 'Électronique numérique — 日本語']
+GROUPS = ['ING1 GI GR1', 'ING1 GI GR1, ING1 GI GR2', 'ING2 GM GR3']
+ROOMS = ['SALLE FER 101', 'CAU 201 & Amphi', 'Amphi Turing, bâtiment principal', '']
+PROFESSORS = ['DUPONT Jean', 'Martin Émile', 'O\'NEIL Sarah']
+
+def make_courses(count, seed):
+    rng = random.Random(seed)
+    start = datetime(2026, 9, 1, 8, 0)
+    courses = []
+    for index in range(count):
+        event_type = rng.choice(['CM', 'TD', 'TP', 'rattrapage'])
+        group = rng.choice(GROUPS)
+        description = f"{group}\nProfesseur: {rng.choice(PROFESSORS)}"
+        if rng.random() < 0.2:
+            description += "\r\nRemarque: " + "salle modifiée, " * rng.randint(1, 8)
+        course_start = start + timedelta(hours=2 * index)
+        courses.append(CourseEvent(
+            f"{rng.choice(SUBJECTS)} - {event_type}", description, rng.choice(ROOMS),
+            course_start, course_start + timedelta(minutes=90), category=event_type,
+            background_color=rng.choice(['#FF6666', '#4a4aff', None]),
+        ))
+    return courses
+
+def write_reference(courses):
+    paris_tz = pytz.timezone('Europe/Paris')
+    chunks = [ICS_HEADER.encode('utf-8')]
+    for index, course in enumerate(courses):
+        chunks.append(build_ics_event(course, paris_tz, f'event-{index}').to_ical())
+    chunks.append(ICS_FOOTER.encode('utf-8'))
+    return b''.join(chunks)
+
+def write_direct(courses):
+    chunks = [ICS_HEADER]
+    for index, course in enumerate(courses):
+        chunks.append(format_vevent(course, f'event-{index}'))
+    chunks.append(ICS_FOOTER)
+    return ''.join(chunks).encode('utf-8')
+
+def read_events(ics_bytes):
+    events = []
+    for component in Calendar.from_ical(ics_bytes).walk('VEVENT'):
+        values = {name: str(component[name]) for name in COMPARED_PROPERTIES if name in component}
+        values['DTSTART'] = component['DTSTART'].dt
+        values['DTEND'] = component['DTEND'].dt
+        events.append(values)
+    return events
+
+def find_long_lines(ics_bytes):
+    return [line for line in ics_bytes.split(b'\r\n') if len(line) > 75]
+
+def best_time(function, courses, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function(courses)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=20000)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    courses = make_courses(args.count, args.seed)
+    reference = write_reference(courses)
+    direct = write_direct(courses)
+
+    errors = []
+    if find_long_lines(direct):
+        errors.append(f"{len(find_long_lines(direct))} lignes de plus de 75 octets")
+    reference_events = read_events(reference)
+    direct_events = read_events(direct)
+    if len(reference_events) != len(direct_events):
+        errors.append(f"{len(reference_events)} événements contre {len(direct_events)}")
+    for index, (expected, actual) in enumerate(zip(reference_events, direct_events)):
+        if expected != actual:
+            errors.append(f"événement {index} différent: {expected} != {actual}")
+            break
+
+    if errors:
+        for error in errors:
+            print(f"✗ {error}")
+        sys.exit(1)
+    print(f"✓ Calendriers équivalents ({len(direct_events)} événements)")
+
+    reference_time = best_time(write_reference, courses, args.runs)
+    direct_time = best_time(write_direct, courses, args.runs)
+    print(f"{'écriture':<12} {'temps (s)':>10} {'événements/s':>14}")
+    print(f"{'icalendar':<12} {reference_time:>10.3f} {args.count / reference_time:>14.0f}")
+    print(f"{'directe':<12} {direct_time:>10.3f} {args.count / direct_time:>14.0f}")
+    print(f"Gain: {reference_time / direct_time:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Mesure le coût des imports de chaque commande de cyCalendar.py
+
+Chaque commande est simulée dans un interpréteur neuf : on importe cyCalendar puis les
+modules que la commande charge, et on vérifie qu'aucune dépendance lourde inutile n'a été
+importée. Le script se termine en erreur si une commande dépasse son budget ou charge un
+module interdit, pour que le coût de démarrage ne revienne pas dans les chemins courants.
+
+Usage: python benchmarks/startup_time.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules importés par chaque commande (voir les fonctions run_* de cyCalendar.py)
+COMMAND_IMPORTS = {
+    'help': [],
+    'auth': ['src.auth'],
+    'fetch': ['src.auth', 'src.calendar_converter'],
+    'convert': ['src.calendar_converter'],
+    'import': ['src.google_calendar'],
+}
+
+# Dépendances lourdes qu'une commande ne doit pas charger
+HEAVY_MODULES = ['selenium', 'webdriver_manager', 'pyvirtualdisplay', 'googleapiclient',
+                 'google_auth_oauthlib', 'icalendar', 'bs4']
+FORBIDDEN = {
+    'help': HEAVY_MODULES + ['requests'],
+    'auth': HEAVY_MODULES,
+    'fetch': HEAVY_MODULES,
+    'convert': HEAVY_MODULES,
+    'import': ['selenium', 'webdriver_manager', 'pyvirtualdisplay', 'bs4'],
+}
+
+# Budget en millisecondes (imports uniquement, hors démarrage de l'interpréteur)
+BUDGET_MS = {
+    'help': 50,
+    'auth': 400,
+    'fetch': 400,
+    'convert': 600,
+    'import': 2000,
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import cyCalendar
+for module in {modules!r}:
+    __import__(module)
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{'ms': elapsed, 'modules': sorted(m.split('.')[0] for m in sys.modules)}}))
+"""
+
+def measure(command, runs):
+    """
+    Returns:
+        tuple: (durée médiane en ms, modules interdits chargés)
+    """
+    durations = []
+    loaded = set()
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-c', PROBE.format(modules=COMMAND_IMPORTS[command])],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        )
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        durations.append(data['ms'])
+        loaded.update(data['modules'])
+    return statistics.median(durations), sorted(set(FORBIDDEN[command]) & loaded)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'commande':<10} {'médiane (ms)':>13} {'budget (ms)':>12}  modules interdits")
+    for command in COMMAND_IMPORTS:
+        median_ms, forbidden = measure(command, args.runs)
+        over_budget = median_ms > BUDGET_MS[command]
+        if over_budget or forbidden:
+            failures += 1
+        status = "✗" if over_budget or forbidden else "✓"
+        print(f"{command:<10} {median_ms:>13.1f} {BUDGET_MS[command]:>12}  {', '.join(forbidden) or '-'} {status}")
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,20 @@
-from src.auth import get_auth_info
-from src.calendar_converter import get_calendar_data, create_ics_file
-from src.google_calendar import import_to_google_calendar
+import argparse
+import os
 import sys
 import time
 import traceback
 
+# Les modules lourds (Selenium, API Google, icalendar) sont importés dans chaque
+# commande pour que les commandes qui n'en ont pas besoin démarrent instantanément
+GENERATED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'generated')
+DEFAULT_JSON = os.path.join(GENERATED_DIR, 'cy_calendar.json')
+DEFAULT_ICS = os.path.join(GENERATED_DIR, 'cy_calendar.ics')
+
 def main():
+    from src.auth import get_auth_info
+    from src.calendar_converter import get_calendar_data, build_course_events, report_parse_cache, start_ics_writer
+    from src.google_calendar import import_to_google_calendar
+    
     print("=== CY Calendar ===")
     
     # Étape 1 : Authentification avec retries
@@ -17,7 +26,8 @@ def main():
     
     for attempt in range(1, max_retries + 1):
         try:
-            cookie, student_id = get_auth_info()
+            # Les événements sont récupérés au passage si le navigateur est utilisé
+            cookie, student_id, prefetched_events = get_auth_info(with_events=True)
             if cookie and student_id:
                 print(f"✓ Authentification réussie après {attempt} tentative(s)")
                 break
@@ -41,7 +51,13 @@ def main():
     print("\n2. Récupération du calendrier...")
     print("================================")
     
+    events_data = prefetched_events
+    if events_data:
+        print("✓ Calendrier déjà récupéré pendant l'authentification")
+    
     for attempt in range(1, max_retries + 1):
+        if events_data:
+            break
         try:
             events_data = get_calendar_data(cookie, student_id)
             if events_data:
@@ -63,22 +79,32 @@ def main():
         print("Erreur lors de la récupération du calendrier après plusieurs tentatives. Arrêt du programme.")
         sys.exit(1)
     
-    # Création du fichier ICS
+    # Conversion des événements, transmis directement à l'import Google
     try:
-        ics_file = create_ics_file(events_data)
-        print(f"✓ Fichier ICS créé avec succès: {ics_file}")
+        courses = build_course_events(events_data)
+        report_parse_cache()
     except Exception as e:
-        print(f"✗ Erreur lors de la création du fichier ICS: {str(e)}")
+        print(f"✗ Erreur lors de la conversion des événements: {str(e)}")
         traceback.print_exc()
         sys.exit(1)
     
+    if not courses:
+        print("Aucun événement n'a pu être converti. Arrêt du programme.")
+        sys.exit(1)
+    
+    # Le fichier ICS n'est plus qu'une copie, écrite pendant l'import (CY_WRITE_ICS=false pour la désactiver)
+    ics_writer = None
+    if os.getenv('CY_WRITE_ICS', 'true').lower() == 'true':
+        ics_writer = start_ics_writer(courses)
+    
     # Étape 3 : Import Google Calendar
     print("\n3. Import dans Google Calendar...")
     print("=================================")
     
     for attempt in range(1, max_retries + 1):
         try:
-            result = import_to_google_calendar(ics_file)
+            # Une nouvelle tentative reprend l'import là où il s'est arrêté
+            result = import_to_google_calendar(events=courses, resume=attempt > 1)
             if result:
                 print(f"✓ Import dans Google Calendar réussi après {attempt} tentative(s)")
                 break
@@ -94,6 +120,9 @@ def main():
                 print(f"Nouvelle tentative dans {retry_delay} secondes...")
                 time.sleep(retry_delay)
     
+    if ics_writer:
+        ics_writer.join()
+    
     if result:
         print("Synchronisation terminée avec succès!")
         sys.exit(0)
@@ -101,5 +130,112 @@ def main():
         print("Échec de l'import dans Google Calendar après plusieurs tentatives.")
         sys.exit(1)
 
+def run_auth(args):
+    """
+    Authentification CY seule (rafraîchit la session sauvegardée)
+    """
+    from src.auth import get_auth_info
+    
+    cookie, student_id = get_auth_info()
+    if not cookie or not student_id:
+        print("Échec de l'authentification.")
+        return 1
+    print(f"✓ Authentification réussie (numéro étudiant: {student_id})")
+    return 0
+
+def run_fetch(args):
+    """
+    Authentification puis sauvegarde de la réponse GetCalendarData en JSON
+    """
+    from src.auth import get_auth_info
+    from src.calendar_converter import get_calendar_data, save_calendar_json
+    
+    cookie, student_id = get_auth_info()
+    if not cookie or not student_id:
+        print("Échec de l'authentification.")
+        return 1
+    
+    events_data = get_calendar_data(cookie, student_id, range=args.range, chunk=args.chunk,
+                                    incremental=args.incremental)
+    if not events_data:
+        print("Erreur lors de la récupération du calendrier.")
+        return 1
+    
+    save_calendar_json(events_data, args.output)
+    return 0
+
+def run_convert(args):
+    """
+    Génère le fichier ICS à partir d'un JSON sauvegardé par la commande fetch
+    """
+    from src.calendar_converter import iter_calendar_json, create_ics_file, report_parse_cache
+    
+    if not os.path.exists(args.input):
+        print(f"Fichier introuvable: {args.input} (lancez d'abord la commande fetch)")
+        return 1
+    
+    # Les événements sont lus et écrits un par un : la mémoire reste constante
+    ics_file = create_ics_file(iter_calendar_json(args.input), args.output)
+    report_parse_cache()
+    return 0 if ics_file else 1
+
+def run_import(args):
+    """
+    Importe un fichier ICS existant dans Google Calendar
+    """
+    from src.google_calendar import import_to_google_calendar
+    
+    if not os.path.exists(args.input):
+        print(f"Fichier introuvable: {args.input}")
+        return 1
+    
+    return 0 if import_to_google_calendar(args.input) else 1
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Synchronise l'emploi du temps CY Tech avec Google Calendar"
+    )
+    parser.add_argument('--offline', action='store_true',
+                        help="n'utilise que les réponses CY en cache (aucune requête au serveur CY)")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    subparsers.add_parser('auth', help="authentification CY uniquement")
+    
+    fetch_parser = subparsers.add_parser('fetch', help="récupère le calendrier CY au format JSON")
+    fetch_parser.add_argument('--range', choices=['year', 'month', 'week'], default='year')
+    fetch_parser.add_argument('--chunk', choices=['week', 'month'], default=None,
+                              help="découpe la plage en fenêtres récupérées en parallèle")
+    fetch_parser.add_argument('--incremental', dest='incremental', action='store_const', const=True, default=None,
+                              help="réutilise les semaines passées de la récupération précédente")
+    fetch_parser.add_argument('--full', dest='incremental', action='store_const', const=False,
+                              help="force une récupération complète")
+    fetch_parser.add_argument('--output', default='cy_calendar.json',
+                              help="nom du fichier JSON créé dans src/generated")
+    
+    convert_parser = subparsers.add_parser('convert', help="convertit le JSON récupéré en fichier ICS")
+    convert_parser.add_argument('--input', default=DEFAULT_JSON)
+    convert_parser.add_argument('--output', default='cy_calendar.ics',
+                                help="nom du fichier ICS créé dans src/generated")
+    
+    import_parser = subparsers.add_parser('import', help="importe un fichier ICS dans Google Calendar")
+    import_parser.add_argument('--input', default=DEFAULT_ICS)
+    
+    subparsers.add_parser('sync', help="authentification, récupération, conversion et import (par défaut)")
+    
+    return parser
+
+COMMANDS = {
+    'auth': run_auth,
+    'fetch': run_fetch,
+    'convert': run_convert,
+    'import': run_import,
+}
+
 if __name__ == "__main__":
+    args = build_parser().parse_args()
+    if args.offline:
+        os.environ['CY_OFFLINE'] = 'true'
+    
+    if args.command in COMMANDS:
+        sys.exit(COMMANDS[args.command](args))
     main()
\ No newline at end of file
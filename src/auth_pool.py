@@ -0,0 +1,140 @@
+import os
+import queue
+import threading
+from src.browser_auth import browser_login, setup_chrome_driver, start_virtual_display
+from src.timings import PhaseTimer
+
+# Nombre maximal de navigateurs simultanés, quelle que soit la taille demandée
+MAX_POOL_SIZE = 8
+
+def clear_browser_cookies(driver):
+    """
+    Vide le stockage de cookies du navigateur pour que chaque compte reparte d'une session vierge
+    """
+    try:
+        driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+    except Exception:
+        # Sans CDP, seuls les cookies du domaine courant peuvent être supprimés
+        driver.delete_all_cookies()
+
+class AuthWorkerPool:
+    """
+    Pool de navigateurs maintenus ouverts pour authentifier plusieurs étudiants à la suite
+
+    Chaque worker possède son propre navigateur, connecte les comptes les uns après les autres
+    (cookies vidés entre deux comptes) et redémarre son navigateur toutes les recycle_after
+    connexions pour limiter la croissance mémoire. Les résultats sont publiés dans la file
+    results sous la forme (username, cookie, student_number).
+    """
+    def __init__(self, size=None, recycle_after=None):
+        size = size or int(os.getenv('CY_AUTH_POOL_SIZE', 2))
+        self.size = max(1, min(size, MAX_POOL_SIZE))
+        self.recycle_after = recycle_after or int(os.getenv('CY_AUTH_POOL_RECYCLE', 20))
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.workers = []
+        self.display = None
+
+    def start(self):
+        """
+        Démarre l'affichage virtuel partagé puis les workers
+        """
+        self.display = start_virtual_display()
+        for index in range(self.size):
+            worker = threading.Thread(target=self._run_worker, args=(index,), daemon=True)
+            worker.start()
+            self.workers.append(worker)
+        print(f"Pool d'authentification démarré: {self.size} navigateur(s), recyclage toutes les {self.recycle_after} connexions")
+
+    def submit(self, username, password):
+        """
+        Ajoute un compte à authentifier
+        """
+        self.jobs.put((username, password))
+
+    def close(self):
+        """
+        Attend la fin des connexions en cours puis ferme les navigateurs et l'affichage
+        """
+        for _ in self.workers:
+            self.jobs.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+        if self.display:
+            try:
+                self.display.stop()
+            except Exception:
+                pass
+            self.display = None
+
+    def authenticate_all(self, accounts):
+        """
+        Authentifie une liste de comptes
+
+        Args:
+            accounts: Liste de tuples (username, password)
+
+        Yields:
+            tuple: (username, cookie, student_number), cookie et student_number valant None en cas d'échec
+        """
+        accounts = list(accounts)
+        self.start()
+        try:
+            for username, password in accounts:
+                self.submit(username, password)
+            for _ in accounts:
+                yield self.results.get()
+        finally:
+            self.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _run_worker(self, index):
+        driver = None
+        logins = 0
+        try:
+            while True:
+                job = self.jobs.get()
+                if job is None:
+                    break
+                username, password = job
+
+                try:
+                    if driver and logins >= self.recycle_after:
+                        print(f"[worker {index}] Recyclage du navigateur après {logins} connexions")
+                        self._quit(driver)
+                        driver = None
+                    if not driver:
+                        driver = setup_chrome_driver()
+                        logins = 0
+                    if not driver:
+                        raise Exception("Impossible d'initialiser le driver Chrome")
+
+                    clear_browser_cookies(driver)
+                    timer = PhaseTimer(f"connexion {username}")
+                    cookie, student_number, _ = browser_login(driver, username, password, timer)
+                    timer.report()
+                    logins += 1
+                    self.results.put((username, cookie, student_number))
+                except Exception as e:
+                    print(f"[worker {index}] ✗ Erreur lors de la connexion de {username}: {e}")
+                    # Navigateur dans un état inconnu : il sera redémarré pour le compte suivant
+                    self._quit(driver)
+                    driver = None
+                    self.results.put((username, None, None))
+        finally:
+            self._quit(driver)
+
+    @staticmethod
+    def _quit(driver):
+        if driver:
+            try:
+                driver.quit()
+            except Exception:
+                pass
@@ -0,0 +1,604 @@
+import os
+import re
+import json
+import time
+import platform
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+from webdriver_manager.chrome import ChromeDriverManager
+from webdriver_manager.microsoft import EdgeChromiumDriverManager
+from src.browser_profile import ProfileLock, is_profile_corrupted, is_profile_enabled, prepare_profile, reset_profile
+from src.calendar_converter import CALENDAR_DATA_URL, build_calendar_request, get_date_range
+from src.timings import PhaseTimer
+
+# Import Display uniquement sous Linux
+if platform.system() != "Windows":
+    from pyvirtualdisplay import Display
+
+# Ressources inutiles pour se connecter, bloquées en mode navigateur allégé
+BLOCKED_URL_PATTERNS = [
+    # Images
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg', '*.ico', '*.webp',
+    # Polices
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    # Feuilles de style
+    '*.css',
+    # Scripts tiers (statistiques, polices hébergées)
+    '*google-analytics.com*', '*googletagmanager.com*', '*fonts.googleapis.com*', '*fonts.gstatic.com*',
+    '*matomo*', '*hotjar.com*',
+]
+
+# Attente avant une nouvelle tentative de connexion (secondes), doublée à chaque échec et plafonnée :
+# des soumissions répétées sans pause risquent de bloquer le compte
+RETRY_BASE_DELAY = 5
+RETRY_MAX_DELAY = 20
+
+def retry_delay(failures):
+    """
+    Attend avant la tentative suivante, selon le nombre d'échecs déjà subis
+    """
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (failures - 1))
+    print(f"Nouvelle tentative dans {delay} secondes...")
+    time.sleep(delay)
+
+def is_lean_browser_enabled():
+    """
+    Indique si le mode navigateur allégé est activé (variable CY_LEAN_BROWSER, activé par défaut)
+    """
+    return os.getenv('CY_LEAN_BROWSER', 'true').lower() == 'true'
+
+def enable_resource_blocking(driver):
+    """
+    Bloque les images, polices, feuilles de style et scripts tiers via Chrome DevTools Protocol
+    """
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+        print(f"Mode navigateur allégé: {len(BLOCKED_URL_PATTERNS)} motifs de ressources bloqués")
+    except Exception as e:
+        print(f"⚠️ Impossible d'activer le blocage des ressources: {e}")
+
+def setup_chrome_driver(user_data_dir=None):
+    """
+    Configuration du driver Chrome pour Windows, Linux et GitHub Actions
+    Args:
+        user_data_dir: Profil Chrome persistant à utiliser (profil temporaire si None)
+    """
+    chrome_options = Options()
+    
+    # Détection du système d'exploitation
+    os_system = platform.system()
+    print(f"Système d'exploitation détecté : {os_system}")
+    
+    # Configuration spécifique pour GitHub Actions et environnement headless
+    if os.getenv('SELENIUM_HEADLESS', 'true').lower() == 'true':
+        print("Configuration du mode headless...")
+        chrome_options.add_argument('--headless=new')
+        
+        # Chemin spécifique pour Ubuntu/Linux en CI
+        if os_system == "Linux":
+            # Vérifier si le binaire existe avant de le spécifier
+            chrome_paths = [
+                "/usr/bin/chromium",
+                "/usr/bin/chromium-browser",
+                "/usr/bin/google-chrome",
+                "/usr/bin/chrome"
+            ]
+            
+            for path in chrome_paths:
+                if os.path.exists(path):
+                    chrome_options.binary_location = path
+                    print(f"Binaire Chrome trouvé: {path}")
+                    break
+    
+    # Options communes à toutes les plateformes
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--window-size=1920,1080')
+    chrome_options.page_load_strategy = 'eager'
+    chrome_options.add_argument('--disable-extensions')
+    chrome_options.add_argument('--disable-infobars')
+    chrome_options.add_argument('--disable-notifications')
+    chrome_options.add_argument('--allow-running-insecure-content')
+    chrome_options.add_argument('--ignore-certificate-errors')
+        
+    # Mode allégé : pas d'images ni de polices distantes à télécharger
+    if is_lean_browser_enabled():
+        chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+        chrome_options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+        })
+        
+    # Profil persistant : les cookies de session survivent entre deux exécutions
+    if user_data_dir:
+        chrome_options.add_argument(f'--user-data-dir={user_data_dir}')
+        
+    # Ajout des options depuis CHROME_OPTS
+    chrome_opts = os.getenv('CHROME_OPTS', '').split()
+    for opt in chrome_opts:
+        chrome_options.add_argument(opt)
+        
+    print("Options Chrome configurées:", chrome_options.arguments)
+    
+    try:
+        driver = None
+        # Installation et configuration spécifique selon la plateforme
+        if os_system == "Windows":
+            print("Configuration pour Windows...")
+            try:
+                print("Tentative avec Chrome...")
+                service = Service(ChromeDriverManager().install())
+                driver = webdriver.Chrome(service=service, options=chrome_options)
+                print("Driver Chrome initialisé avec succès sur Windows")
+            except Exception as chrome_error:
+                print(f"Erreur Chrome sur Windows: {chrome_error}")
+                
+                print("Tentative d'utilisation de Microsoft Edge...")
+                try:
+                    edge_options = webdriver.EdgeOptions()
+                    for arg in chrome_options.arguments:
+                        edge_options.add_argument(arg)
+                    
+                    service = Service(EdgeChromiumDriverManager().install())
+                    driver = webdriver.Edge(service=service, options=edge_options)
+                    print("Driver Edge initialisé avec succès sur Windows")
+                except Exception as edge_error:
+                    print(f"Erreur Edge sur Windows: {edge_error}")
+                    raise Exception("Tous les navigateurs ont échoué")
+        else:
+            # Configuration pour Linux/Mac
+            try:
+                # Vérifier les chemins possibles pour chromedriver
+                chromedriver_paths = [
+                    "/usr/bin/chromedriver",
+                    "/usr/local/bin/chromedriver"
+                ]
+                
+                driver_path = None
+                for path in chromedriver_paths:
+                    if os.path.exists(path):
+                        driver_path = path
+                        print(f"Chromedriver trouvé: {path}")
+                        break
+                
+                # Si un chemin a été trouvé, l'utiliser
+                if driver_path:
+                    service = Service(driver_path)
+                    driver = webdriver.Chrome(service=service, options=chrome_options)
+                    print("Driver Chrome initialisé avec succès sur Linux/Mac")
+                else:
+                    print("Aucun chromedriver trouvé dans les chemins standards")
+                    raise Exception("Chromedriver non trouvé")
+                    
+            except Exception as e:
+                print(f"Erreur lors de l'initialisation du driver: {e}")
+                return None
+        
+        if driver:
+            driver.set_page_load_timeout(30)
+            if is_lean_browser_enabled():
+                enable_resource_blocking(driver)
+            return driver
+        else:
+            raise Exception("Aucun driver n'a pu être initialisé")
+    
+    except Exception as e:
+        print(f"Erreur lors de l'initialisation du driver: {str(e)}")
+        return None
+
+# Le reste du code reste inchangé
+def check_login_success(driver):
+    """Vérifie si la connexion a réussi en vérifiant différents éléments sur la page"""
+    try:
+        # Vérifier si l'URL contient '/calendar'
+        if '/calendar' not in driver.current_url:
+            print("L'URL ne contient pas '/calendar'")
+            return False
+            
+        # Vérifier si l'URL contient des paramètres comme 'fid0='
+        if 'fid0=' not in driver.current_url:
+            print("L'URL ne contient pas 'fid0='")
+            return False
+            
+        # Vérifier si le titre de la page est correct
+        if 'Calendrier' not in driver.title and 'Calendar' not in driver.title:
+            print(f"Le titre de la page ne correspond pas: '{driver.title}'")
+            return False
+            
+        return True
+    except Exception as e:
+        print(f"Erreur lors de la vérification du succès de connexion: {e}")
+        return False
+
+def wait_for_login_result(driver, submitted_field, timeout=20):
+    """
+    Attend la fin de la soumission du formulaire de connexion
+
+    Returns:
+        bool: True si la page de connexion a été quittée pour le calendrier, False si le
+            formulaire est réaffiché (identifiants refusés)
+
+    Raises:
+        TimeoutException: si aucune des deux situations ne se produit avant la fin du délai
+    """
+    def login_result(d):
+        url = d.current_url
+        if '/calendar' in url and 'LdapLogin' not in url:
+            return 'success'
+        # Page rechargée mais toujours sur LdapLogin avec un nouveau formulaire : connexion refusée
+        if 'LdapLogin' in url and EC.staleness_of(submitted_field)(d) and d.find_elements(By.ID, "Name"):
+            return 'rejected'
+        return False
+
+    return WebDriverWait(driver, timeout).until(login_result) == 'success'
+
+def wait_for_page_ready(driver, timeout=10):
+    """Attend que le document courant soit chargé (DOM disponible)"""
+    WebDriverWait(driver, timeout).until(
+        lambda d: d.execute_script('return document.readyState') in ('interactive', 'complete')
+    )
+
+def wait_for_calendar_cookie(driver, timeout=10):
+    """
+    Attend que le cookie .Calendar.Cookies soit présent dans le navigateur
+    Returns:
+        dict: le cookie, ou None s'il n'est pas apparu avant la fin du délai
+    """
+    try:
+        return WebDriverWait(driver, timeout).until(
+            lambda d: d.get_cookie('.Calendar.Cookies')
+        )
+    except TimeoutException:
+        return None
+
+# Exécuté dans la page : réutilise la session et la connexion déjà ouvertes par le navigateur
+FETCH_CALENDAR_SCRIPT = """
+const [url, body, done] = arguments;
+fetch(url, {
+    method: 'POST',
+    credentials: 'same-origin',
+    headers: {
+        'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
+        'Accept': 'application/json, text/javascript, */*; q=0.01',
+        'X-Requested-With': 'XMLHttpRequest'
+    },
+    body: body
+})
+    .then(response => response.ok ? response.text() : Promise.reject('HTTP ' + response.status))
+    .then(text => done({ok: true, text: text}), error => done({ok: false, error: String(error)}));
+"""
+
+def fetch_calendar_in_browser(driver, student_number, range='year'):
+    """
+    Récupère les données GetCalendarData depuis la page authentifiée, sans nouvelle session HTTP
+    Returns:
+        list: Les événements du calendrier, ou None en cas d'échec
+    """
+    try:
+        start_date, end_date = get_date_range(range)
+        payload, _ = build_calendar_request(
+            student_number, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
+        )
+        driver.set_script_timeout(30)
+        result = driver.execute_async_script(FETCH_CALENDAR_SCRIPT, CALENDAR_DATA_URL, payload)
+        
+        if not result or not result.get('ok'):
+            print(f"✗ Récupération du calendrier dans le navigateur échouée: {result and result.get('error')}")
+            return None
+        
+        events = json.loads(result['text'])
+        print(f"{len(events)} événements récupérés depuis le navigateur")
+        return events or None
+    except Exception as e:
+        print(f"✗ Erreur lors de la récupération du calendrier dans le navigateur: {e}")
+        return None
+
+def start_virtual_display():
+    """
+    Démarre l'affichage virtuel, uniquement sous Linux/Mac en mode headless
+    Returns:
+        Display: l'affichage démarré, ou None s'il n'est pas nécessaire
+    """
+    if platform.system() != "Windows" and os.getenv('SELENIUM_HEADLESS', 'true').lower() == 'true':
+        print("Initialisation de l'affichage virtuel (Linux/Mac)...")
+        display = Display(visible=0, size=(1920, 1080))
+        display.start()
+        return display
+    return None
+
+def browser_login(driver, username, password, timer=None, fetch_range=None):
+    """
+    Effectue la connexion au portail CY dans un navigateur déjà démarré
+    Args:
+        driver: Driver Selenium à utiliser
+        username: Identifiant CY
+        password: Mot de passe CY
+        timer: PhaseTimer optionnel recevant la durée de chaque phase
+        fetch_range: Si défini ('year', 'month', 'week'), récupère aussi les événements
+            de cette plage depuis la page authentifiée
+    Returns:
+        tuple: (cookies, student_number, events) ou (None, None, None) en cas d'échec,
+            events valant None si fetch_range n'est pas défini ou si la récupération a échoué
+    """
+    timer = timer or PhaseTimer("connexion navigateur")
+    
+    # Processus global avec maximum de tentatives
+    global_max_attempts = 3
+    for global_attempt in range(global_max_attempts):
+        if global_attempt > 0:
+            retry_delay(global_attempt)
+        print("\n" + "=" * 60)
+        print(f"===== TENTATIVE GLOBALE {global_attempt + 1}/{global_max_attempts} =====")
+        print("=" * 60)
+        
+        # 1. Connexion
+        print("\n" + "-" * 40)
+        print("ÉTAPE 1: CONNEXION AU PORTAIL CY")
+        print("-" * 40)
+        connection_success = False
+        for login_attempt in range(3):
+            try:
+                print(f"\nTentative de connexion {login_attempt + 1}/3...")
+                print("·" * 30)
+                
+                with timer.phase('page_load'):
+                    # D'abord, accéder à la page d'accueil du service
+                    driver.get('https://services-web.cyu.fr/calendar/')
+                    wait_for_page_ready(driver)
+                    
+                    # Vérifier si nous sommes déjà connectés
+                    already_connected = check_login_success(driver)
+                
+                if already_connected:
+                    print("Déjà connecté, pas besoin d'authentification!")
+                    connection_success = True
+                    break
+                
+                with timer.phase('page_load'):
+                    # Sinon, aller à la page de connexion
+                    print("Accès à la page de connexion...")
+                    driver.get('https://services-web.cyu.fr/calendar/LdapLogin')
+                    
+                    # Attendre et vérifier que la page de login est bien chargée
+                    try:
+                        WebDriverWait(driver, 10).until(
+                            EC.presence_of_element_located((By.ID, "Name"))
+                        )
+                    except TimeoutException:
+                        print("Impossible de trouver le champ 'Name' sur la page de login")
+                        print(f"URL actuelle: {driver.current_url}")
+                        print(f"Titre: {driver.title}")
+                        raise Exception("Page de login non chargée correctement")
+                
+                with timer.phase('submit'):
+                    # Remplir le formulaire
+                    username_field = driver.find_element(By.ID, "Name")
+                    password_field = driver.find_element(By.ID, "Password")
+                    
+                    username_field.clear()  # S'assurer que le champ est vide
+                    password_field.clear()
+                    
+                    username_field.send_keys(username)
+                    password_field.send_keys(password)
+                    
+                    # Soumettre le formulaire
+                    print("Soumission du formulaire...")
+                    password_field.submit()
+                
+                with timer.phase('redirect'):
+                    # Attendre que la page de connexion soit quittée pour le calendrier
+                    try:
+                        if not wait_for_login_result(driver, password_field):
+                            # Inutile de réessayer avec les mêmes identifiants
+                            print("\n✗ Identifiants refusés par le portail CY")
+                            return None, None, None
+                        wait_for_page_ready(driver)
+                        print(f"URL après redirection: {driver.current_url}")
+                    except Exception as e:
+                        print(f"Erreur lors de l'attente de redirection: {e}")
+                        raise
+                
+                # Vérifier explicitement si la connexion a réussi
+                if check_login_success(driver):
+                    print("\n✓ Connexion réussie !")
+                    connection_success = True
+                    break
+                else:
+                    print("\n✗ La connexion semble avoir échoué malgré la redirection.")
+                    raise Exception("Échec de connexion après redirection")
+                
+            except Exception as e:
+                print(f"\n✗ ERREUR: Tentative de connexion {login_attempt + 1} échouée: {str(e)}")
+                
+                if login_attempt < 2:
+                    print("Nouvelle tentative de connexion...")
+                    retry_delay(login_attempt + 1)
+                else:
+                    print("Échec de toutes les tentatives de connexion.")
+        
+        if not connection_success:
+            if global_attempt < global_max_attempts - 1:
+                print("\n✗ Échec de connexion, nouvelle tentative globale...")
+                continue
+            else:
+                print("\n✗ Toutes les tentatives globales ont échoué.")
+                return None, None, None
+        
+        # 2. Extraction du numéro étudiant
+        print("\n" + "-" * 40)
+        print("ÉTAPE 2: EXTRACTION DU NUMÉRO ÉTUDIANT")
+        print("-" * 40)
+        current_url = driver.current_url
+        print("URL après connexion:", current_url)
+        
+        print("Extraction du numéro étudiant...")
+        student_match = re.search(r'fid0=(\d+)', current_url)
+        
+        if not student_match:
+            print("✗ ERREUR: Impossible de trouver le numéro étudiant dans l'URL")
+            print(f"URL actuelle: {current_url}")
+            print(f"Titre de la page: {driver.title}")
+            
+            # Essayer une URL alternative ou rechercher ailleurs
+            print("\nTentative d'accès à la page de l'agenda...")
+            try:
+                with timer.phase('redirect'):
+                    driver.get('https://services-web.cyu.fr/calendar/Home/ReadCalendar/')
+                    try:
+                        WebDriverWait(driver, 10).until(EC.url_contains('fid0='))
+                    except TimeoutException:
+                        pass
+                
+                # Vérifier la nouvelle URL
+                current_url = driver.current_url
+                print("Nouvelle URL:", current_url)
+                student_match = re.search(r'fid0=(\d+)', current_url)
+                
+                if not student_match:
+                    print("✗ Toujours pas de numéro étudiant trouvé.")
+                    print("Contenu HTML de la page (premiers 1000 caractères):")
+                    print(driver.page_source[:1000])
+                    
+                    if global_attempt < global_max_attempts - 1:
+                        print("\n✗ Échec de l'extraction du numéro étudiant, nouvelle tentative globale...")
+                        continue
+                    else:
+                        print("\n✗ Toutes les tentatives globales ont échoué.")
+                        return None, None, None
+            except Exception as e:
+                print(f"\n✗ Erreur lors de l'accès à la page de l'agenda: {e}")
+                if global_attempt < global_max_attempts - 1:
+                    continue
+                else:
+                    return None, None, None
+        
+        student_number = student_match.group(1)
+        print(f"✓ Numéro étudiant trouvé: {student_number}")
+        
+        # 3. Récupération des cookies
+        print("\n" + "-" * 40)
+        print("ÉTAPE 3: RÉCUPÉRATION DES COOKIES")
+        print("-" * 40)
+        print("Récupération des cookies...")
+        with timer.phase('cookie_harvest'):
+            calendar_cookie = wait_for_calendar_cookie(driver, timeout=5)
+            cookies = driver.get_cookies()
+        print(f"Cookies trouvés: {len(cookies)}")
+        print("Noms des cookies:", [c['name'] for c in cookies])
+        
+        if not calendar_cookie:
+            print("✗ ERREUR: Cookie .Calendar.Cookies non trouvé")
+            
+            # Essayer de rafraîchir la page pour avoir tous les cookies
+            print("Tentative de rafraîchissement de la page...")
+            with timer.phase('cookie_harvest'):
+                driver.refresh()
+                calendar_cookie = wait_for_calendar_cookie(driver)
+                cookies = driver.get_cookies()
+            print(f"Cookies après rafraîchissement: {len(cookies)}")
+            print("Noms des cookies après rafraîchissement:", [c['name'] for c in cookies])
+            
+            if not calendar_cookie:
+                print("✗ Cookie toujours introuvable après rafraîchissement")
+                if global_attempt < global_max_attempts - 1:
+                    print("\n✗ Échec de récupération du cookie, nouvelle tentative globale...")
+                    continue
+                else:
+                    print("\n✗ Toutes les tentatives globales ont échoué.")
+                    return None, None, None
+        
+        # Si on arrive ici, tout a réussi
+        print("\n" + "=" * 60)
+        print("✓✓✓ AUTHENTIFICATION COMPLÈTE RÉUSSIE ! ✓✓✓")
+        print("=" * 60)
+        
+        events = None
+        if fetch_range:
+            with timer.phase('calendar_fetch'):
+                events = fetch_calendar_in_browser(driver, student_number, fetch_range)
+        return calendar_cookie, student_number, events
+    
+    return None, None, None
+
+def get_browser_auth_info(username, password, timer=None, fetch_range=None):
+    """
+    Se connecte au portail CY avec Selenium et récupère les cookies et informations nécessaires
+    Args:
+        username: Identifiant CY
+        password: Mot de passe CY
+        timer: PhaseTimer optionnel recevant la durée de chaque phase
+        fetch_range: Si défini ('year', 'month', 'week'), récupère aussi les événements
+            de cette plage depuis la page authentifiée
+    Returns:
+        tuple: (cookies, student_number, events) ou (None, None, None) en cas d'erreur,
+            events valant None si fetch_range n'est pas défini ou si la récupération a échoué
+    """
+    driver = None
+    display = None
+    profile_lock = None
+    timer = timer or PhaseTimer("authentification navigateur")
+    
+    try:
+        with timer.phase('driver_start'):
+            display = start_virtual_display()
+            
+            # Profil persistant, réservé à cette exécution le temps de la connexion
+            profile_dir = None
+            if is_profile_enabled():
+                profile_lock = ProfileLock()
+                if profile_lock.acquire():
+                    profile_dir = prepare_profile()
+                    print(f"Utilisation du profil Chrome persistant: {profile_dir}")
+                else:
+                    print("Profil Chrome déjà utilisé par une autre exécution, utilisation d'un profil temporaire")
+            
+            # Initialisation du driver Chrome
+            driver = setup_chrome_driver(user_data_dir=profile_dir)
+            if not driver and profile_dir:
+                # Le profil n'est réinitialisé que s'il est en cause, pour garder la connexion enregistrée
+                if is_profile_corrupted(profile_dir):
+                    reset_profile(profile_dir)
+                    driver = setup_chrome_driver(user_data_dir=profile_dir)
+                else:
+                    print("Nouvel essai avec un profil temporaire...")
+                    driver = setup_chrome_driver()
+                    if driver:
+                        # Chrome démarre sans le profil : c'est lui qui l'en empêchait
+                        reset_profile(profile_dir)
+        if not driver:
+            print("ERREUR: Impossible d'initialiser le driver Chrome")
+            return None, None, None
+        
+        return browser_login(driver, username, password, timer, fetch_range)
+        
+    except Exception as e:
+        print("\n" + "!" * 60)
+        print(f"✗✗✗ ERREUR CRITIQUE: {str(e)}")
+        print("!" * 60)
+        if driver:
+            try:
+                print("URL actuelle:", driver.current_url)
+                print("Titre de la page:", driver.title)
+            except:
+                print("Impossible d'accéder aux informations de la page")
+        return None, None, None
+        
+    finally:
+        if driver:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        if display:
+            try:
+                display.stop()
+            except Exception:
+                pass
+        if profile_lock:
+            profile_lock.release()
@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import shutil
+import platform
+from src.session_cache import CACHE_DIR
+
+PROFILE_DIR = os.path.join(CACHE_DIR, 'chrome-profile')
+
+# Fichiers laissés par Chrome lorsqu'il est interrompu brutalement
+CHROME_SINGLETON_FILES = ['SingletonLock', 'SingletonSocket', 'SingletonCookie']
+
+# Sous Windows, un verrou plus ancien que ce délai est considéré comme abandonné
+STALE_LOCK_SECONDS = 3600
+
+def is_profile_enabled():
+    """
+    Indique si le profil Chrome persistant est activé (variable CY_CHROME_PROFILE, activé par défaut)
+    """
+    return os.getenv('CY_CHROME_PROFILE', 'true').lower() == 'true'
+
+def is_process_alive(pid):
+    """
+    Vérifie si un processus existe encore
+    """
+    if platform.system() == "Windows":
+        # os.kill termine le processus sous Windows : on ne peut pas l'utiliser pour tester
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class ProfileLock:
+    """
+    Verrou empêchant deux exécutions d'utiliser le même profil Chrome en même temps
+    """
+    def __init__(self, profile_dir=PROFILE_DIR):
+        self.profile_dir = profile_dir
+        self.lock_path = profile_dir.rstrip(os.sep) + '.lock'
+        self.acquired = False
+
+    def is_stale(self):
+        """
+        Un verrou est abandonné si son processus n'existe plus (ou s'il est trop ancien sous Windows)
+        """
+        try:
+            with open(self.lock_path, 'r') as f:
+                pid = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return True
+
+        alive = is_process_alive(pid)
+        if alive is None:
+            try:
+                return time.time() - os.path.getmtime(self.lock_path) > STALE_LOCK_SECONDS
+            except OSError:
+                return True
+        return not alive
+
+    def acquire(self):
+        """
+        Returns:
+            bool: True si le verrou a été obtenu, False si le profil est utilisé par une autre exécution
+        """
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                with os.fdopen(fd, 'w') as f:
+                    f.write(str(os.getpid()))
+                self.acquired = True
+                return True
+            except FileExistsError:
+                if not self.is_stale():
+                    return False
+                print("Verrou de profil abandonné détecté, suppression...")
+                try:
+                    os.remove(self.lock_path)
+                except OSError:
+                    return False
+        return False
+
+    def release(self):
+        if self.acquired:
+            try:
+                os.remove(self.lock_path)
+            except OSError:
+                pass
+            self.acquired = False
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+def is_profile_corrupted(profile_dir=PROFILE_DIR):
+    """
+    Détecte un profil inutilisable (fichier 'Local State' ou préférences illisibles)
+    """
+    for relative_path in ['Local State', os.path.join('Default', 'Preferences')]:
+        path = os.path.join(profile_dir, relative_path)
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                json.load(f)
+        except (OSError, ValueError):
+            print(f"Fichier de profil corrompu: {relative_path}")
+            return True
+    return False
+
+def reset_profile(profile_dir=PROFILE_DIR):
+    """
+    Supprime le profil pour repartir d'un profil vierge
+    """
+    print(f"Réinitialisation du profil Chrome: {profile_dir}")
+    shutil.rmtree(profile_dir, ignore_errors=True)
+    os.makedirs(profile_dir, exist_ok=True)
+
+def prepare_profile(profile_dir=PROFILE_DIR):
+    """
+    Prépare le profil avant le lancement de Chrome (à appeler en détenant le verrou)
+
+    Returns:
+        str: Chemin du profil à passer à --user-data-dir
+    """
+    os.makedirs(profile_dir, exist_ok=True)
+
+    if is_profile_corrupted(profile_dir):
+        reset_profile(profile_dir)
+
+    # Le verrou est détenu : les fichiers Singleton restants viennent d'un Chrome interrompu
+    for name in CHROME_SINGLETON_FILES:
+        path = os.path.join(profile_dir, name)
+        if os.path.lexists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    return profile_dir
@@ -1,15 +1,74 @@
 import requests
 from datetime import datetime, timedelta
-import uuid
-from icalendar import Calendar, Event
-import pytz
 import os
+import copy
+import json
+import gzip
+import zlib
+import threading
+from functools import lru_cache
+from http.cookiejar import DefaultCookiePolicy
 from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError as Urllib3HTTPError, ProtocolError, ReadTimeoutError
 from urllib3.util.retry import Retry
 import re
 import html
+from urllib.parse import quote_plus
 
-def create_session():
+if __name__ == "__main__":
+    # Exécution directe (python src/calendar_converter.py) : rend le paquet src importable
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ics_writer import ICS_FOOTER, ICS_HEADER, format_vevent
+from src.response_cache import (
+    find_offline_response, get_cached_response, is_offline, make_key, make_resource_key, store_response
+)
+
+# Décodeur JSON et décompression Brotli plus rapides, utilisés s'ils sont installés
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CALENDAR_DATA_URL = "https://services-web.cyu.fr/calendar/Home/GetCalendarData"
+# Types de ressources Celcat : emploi du temps d'un étudiant ou d'un groupe (TD/TP)
+STUDENT_RES_TYPE = 104
+COLOUR_SCHEME = 3
+GROUP_RES_TYPE = int(os.getenv('CY_GROUP_RES_TYPE', 103))
+GENERATED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generated')
+
+# Nombre de descriptions distinctes gardées en mémoire par parse_description
+PARSE_CACHE_SIZE = int(os.getenv('CY_PARSE_CACHE_SIZE', 4096))
+
+# Découpage des descriptions : les <br> séparent les lignes, les autres balises sont retirées
+LINE_BREAK_PATTERN = re.compile(r'<br\s*/?>')
+TAG_PATTERN = re.compile(r'<[^>]*>')
+# Ligne désignant une salle (mot-clé ou code de bâtiment) dans la description d'un rattrapage
+ROOM_PATTERN = re.compile(r'SALLE|Amphi|FER|CAU|TUR|CON')
+
+ACCEPT_ENCODING = 'gzip, deflate, br' if brotli else 'gzip, deflate'
+SHARED_POOL_SIZE = 10
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+class OfflineCacheMiss(requests.exceptions.RequestException):
+    """
+    Donnée demandée en mode hors ligne mais absente du cache
+    """
+
+class InvalidCalendarResponse(requests.exceptions.RequestException):
+    """
+    Réponse GetCalendarData illisible : corps mal compressé ou autre chose que du JSON
+    (par exemple la page de connexion après expiration de la session)
+    """
+
+def create_session(pool_size=10):
     """
     Creates an optimized session with retry strategy
     """
@@ -19,22 +78,120 @@ def create_session():
         backoff_factor=0.5,
         status_forcelist=[500, 502, 503, 504]
     )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
+    adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=pool_size, pool_maxsize=pool_size)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     return session
 
-def get_calendar_data(cookie, student_number, range='year'):
+def get_shared_session():
     """
-    Récupère les données du calendrier de l'étudiant
+    Retourne le client HTTP partagé par tout le processus pour les requêtes GetCalendarData
+    
+    Les connexions restent ouvertes (keep-alive) d'une requête à l'autre et les réponses sont
+    demandées compressées. Le cookie d'authentification étant passé à chaque requête, les
+    cookies renvoyés par le serveur ne sont pas conservés.
+    """
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            session = create_session(pool_size=SHARED_POOL_SIZE)
+            session.headers.update({
+                'Accept-Encoding': ACCEPT_ENCODING,
+                'Connection': 'keep-alive',
+            })
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            _shared_session = session
+        return _shared_session
+
+class TransferStats:
+    """
+    Compte les octets reçus sur le réseau et après décompression
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+    
+    def record(self, wire_bytes, decoded_bytes):
+        with self.lock:
+            self.requests += 1
+            self.wire_bytes += wire_bytes
+            self.decoded_bytes += decoded_bytes
+    
+    def report(self):
+        if not self.requests:
+            return
+        ratio = self.decoded_bytes / self.wire_bytes if self.wire_bytes else 0
+        print(f"Transfert: {self.requests} requête(s), {self.wire_bytes / 1024:.1f} Ko reçus, "
+              f"{self.decoded_bytes / 1024:.1f} Ko décodés (compression x{ratio:.1f})")
+
+transfer_stats = TransferStats()
+
+def decode_body(raw, content_encoding):
+    """
+    Décompresse le corps d'une réponse selon son en-tête Content-Encoding
+    """
+    encodings = [encoding.strip().lower() for encoding in (content_encoding or '').split(',') if encoding.strip()]
+    for encoding in reversed(encodings):
+        if encoding == 'gzip':
+            raw = gzip.decompress(raw)
+        elif encoding == 'deflate':
+            try:
+                raw = zlib.decompress(raw)
+            except zlib.error:
+                raw = zlib.decompress(raw, -zlib.MAX_WBITS)
+        elif encoding == 'br' and brotli:
+            raw = brotli.decompress(raw)
+        elif encoding != 'identity':
+            raise ValueError(f"Encodage de contenu non supporté: {encoding}")
+    return raw
+
+def decode_json(content):
+    """
+    Décode du JSON avec orjson s'il est installé (CY_JSON_DECODER=json pour forcer le module standard)
+    """
+    if orjson and os.getenv('CY_JSON_DECODER', 'auto').lower() != 'json':
+        return orjson.loads(content)
+    return json.loads(content)
+
+def build_calendar_request(student_number, start_date_str, end_date_str, res_type=STUDENT_RES_TYPE):
+    """
+    Construit le payload et les en-têtes d'une requête GetCalendarData
+    
+    Args:
+        student_number: Numéro étudiant, ou liste de numéros pour une requête groupée
+        res_type: Type de ressource demandée (STUDENT_RES_TYPE ou GROUP_RES_TYPE)
+    
+    Returns:
+        tuple: (payload, headers)
+    """
+    current_date = datetime.now()
+    student_numbers = student_number if isinstance(student_number, (list, tuple)) else [student_number]
+    federation_ids = ''.join(f'&federationIds%5B%5D={quote_plus(str(number))}' for number in student_numbers)
+    
+    payload = f'start={start_date_str}&end={end_date_str}&resType={res_type}&calView=month{federation_ids}&colourScheme={COLOUR_SCHEME}'
+    
+    headers = {
+        'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
+        'Accept': 'application/json, text/javascript, */*; q=0.01',
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36',
+        'X-Requested-With': 'XMLHttpRequest',
+        'Origin': 'https://services-web.cyu.fr',
+        'Referer': f'https://services-web.cyu.fr/calendar/cal?vt=month&dt={current_date.strftime("%Y-%m-%d")}&et=student&fid0={student_numbers[0]}',
+    }
+    
+    return payload, headers
+
+def get_date_range(range='year'):
+    """
+    Calcule les dates de début et de fin de la plage demandée
     
     Args:
-        cookie: Cookie d'authentification
-        student_number: Numéro étudiant
         range: Plage de dates ('year', 'month', 'week')
         
     Returns:
-        Liste des événements du calendrier
+        tuple: (start_date, end_date) sous forme de datetime
     """
     current_date = datetime.now()
     current_year = current_date.year
@@ -42,62 +199,138 @@ def get_calendar_data(cookie, student_number, range='year'):
     
     if range == 'year':
         end_date = current_date + timedelta(days=60)
-        end_date_str = end_date.strftime('%Y-%m-%d')
         
         if current_month < 9:
             start_date = datetime(current_year, 1, 1)
-            start_date_str = start_date.strftime('%Y-%m-%d')
         else:
             start_date = datetime(current_year, 9, 1)
-            start_date_str = start_date.strftime('%Y-%m-%d')
     elif range == 'month':
         start_date = datetime(current_year, current_month, 1)
-        start_date_str = start_date.strftime('%Y-%m-%d')
         end_date = (start_date + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        end_date_str = end_date.strftime('%Y-%m-%d')
     elif range == 'week':
         start_date = current_date - timedelta(days=current_date.weekday())
-        start_date_str = start_date.strftime('%Y-%m-%d')
         end_date = start_date + timedelta(days=6)
-        end_date_str = end_date.strftime('%Y-%m-%d')
     else:
         raise ValueError("Range must be 'year', 'month', or 'week'")
     
-    url = "https://services-web.cyu.fr/calendar/Home/GetCalendarData"
-    
-    request_cookies = {cookie['name']: cookie['value']}
-    
-    payload = f'start={start_date_str}&end={end_date_str}&resType=104&calView=month&federationIds%5B%5D={student_number}&colourScheme=3'
+    return start_date, end_date
+
+def post_calendar_request(session, cookie, student_number, start_date_str, end_date_str, timeout=(5, 15),
+                          res_type=STUDENT_RES_TYPE):
+    """
+    Envoie une requête GetCalendarData pour une plage de dates
     
-    headers = {
-        'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-        'Accept': 'application/json, text/javascript, */*; q=0.01',
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36',
-        'X-Requested-With': 'XMLHttpRequest',
-        'Origin': 'https://services-web.cyu.fr',
-        'Referer': f'https://services-web.cyu.fr/calendar/cal?vt=month&dt={current_date.strftime("%Y-%m-%d")}&et=student&fid0={student_number}',
-    }
+    Les réponses sont conservées dans le cache disque (voir response_cache) : une nouvelle
+    tentative dans le délai de validité ne sollicite pas le serveur CY.
     
-    events = None
+    Returns:
+        list: Les événements de la plage (éventuellement vide)
+        
+    Raises:
+        requests.exceptions.RequestException: en cas d'erreur réseau ou HTTP, de réponse
+            illisible, ou si la réponse n'est pas en cache en mode hors ligne
+    """
+    cache_key = make_key(student_number, start_date_str, end_date_str, res_type, COLOUR_SCHEME)
+    resource = make_resource_key(student_number, res_type, COLOUR_SCHEME)
+    cached_events = get_cached_response(cache_key)
+    if cached_events is None and is_offline():
+        cached_events = find_offline_response(resource, start_date_str, end_date_str)
+    if cached_events is not None:
+        return cached_events
+    if is_offline():
+        raise OfflineCacheMiss(f"Réponse absente du cache pour {start_date_str} → {end_date_str} (mode hors ligne)")
+    
+    payload, headers = build_calendar_request(student_number, start_date_str, end_date_str, res_type)
+    response = session.post(
+        CALENDAR_DATA_URL,
+        headers=headers,
+        data=payload,
+        cookies={cookie['name']: cookie['value']},
+        timeout=timeout,
+        verify=True,
+        stream=True
+    )
     try:
-        session = create_session()
-        response = session.post(
-            url,
-            headers=headers,
-            data=payload,
-            cookies=request_cookies,
-            timeout=(5, 15),  
-            verify=True  
-        )
         response.raise_for_status()
-        events = response.json()
-        
-        if not events:
-            print("Aucun événement reçu!")
-            return None
+        # Lecture du corps tel que reçu, pour mesurer les octets réellement transférés
+        raw = response.raw.read(decode_content=False)
+    except Urllib3HTTPError as e:
+        # La lecture directe contourne requests : ses erreurs sont converties comme le faisait response.json()
+        response.close()
+        if isinstance(e, ReadTimeoutError):
+            raise requests.exceptions.ReadTimeout(e, response=response) from e
+        if isinstance(e, ProtocolError):
+            raise requests.exceptions.ChunkedEncodingError(e, response=response) from e
+        raise requests.exceptions.ConnectionError(e, response=response) from e
+    except BaseException:
+        # Connexion avec des données non lues : elle n'est pas rendue au pool
+        response.close()
+        raise
+    # Rend la connexion au pool pour la requête suivante (keep-alive)
+    response.raw.release_conn()
+    
+    try:
+        content = decode_body(raw, response.headers.get('Content-Encoding'))
+        transfer_stats.record(len(raw), len(content))
+        events = decode_json(content)
+    except (ValueError, OSError, zlib.error) as e:
+        # Erreurs de décodage signalées comme les autres erreurs de requête, comme le faisait response.json()
+        raise InvalidCalendarResponse(f"Réponse du serveur CY illisible: {e}", response=response) from e
+    store_response(cache_key, events, resource, start_date_str, end_date_str)
+    return events
+
+def get_calendar_data(cookie, student_number, range='year', chunk=None, incremental=None):
+    """
+    Récupère les données du calendrier de l'étudiant
+    
+    Args:
+        cookie: Cookie d'authentification
+        student_number: Numéro étudiant
+        range: Plage de dates ('year', 'month', 'week')
+        chunk: Découpe la plage en fenêtres ('week', 'month') récupérées en parallèle.
+            Par défaut, valeur de la variable CY_FETCH_CHUNK (une seule requête si vide)
+        incremental: Réutilise les semaines passées de la récupération précédente
+            (voir calendar_snapshot). Par défaut, valeur de la variable CY_INCREMENTAL
         
-        print(f"{len(events)} événements récupérés")
-        return events
+    Returns:
+        Liste des événements du calendrier
+    """
+    start_date, end_date = get_date_range(range)
+    chunk = chunk if chunk is not None else os.getenv('CY_FETCH_CHUNK', '')
+    if incremental is None:
+        incremental = os.getenv('CY_INCREMENTAL', 'false').lower() == 'true'
+    
+    if incremental:
+        from src.calendar_snapshot import get_incremental_calendar_data
+        events = get_incremental_calendar_data(cookie, student_number, start_date, end_date, chunk)
+    else:
+        events = fetch_calendar_range(cookie, student_number, start_date, end_date, chunk)
+    
+    transfer_stats.report()
+    
+    if not events:
+        print("Aucun événement reçu!")
+        return None
+    
+    print(f"{len(events)} événements récupérés")
+    return events
+
+def fetch_calendar_range(cookie, student_number, start_date, end_date, chunk=''):
+    """
+    Récupère les événements entre deux dates, en une requête ou par fenêtres parallèles
+    
+    Returns:
+        list: Les événements (éventuellement vide), ou None en cas d'erreur
+    """
+    if chunk:
+        windows = split_date_range(start_date, end_date, chunk)
+        return fetch_calendar_windows(cookie, student_number, windows)
+    
+    start_date_str = start_date.strftime('%Y-%m-%d')
+    end_date_str = end_date.strftime('%Y-%m-%d')
+    
+    try:
+        return post_calendar_request(get_shared_session(), cookie, student_number, start_date_str, end_date_str)
         
     except requests.exceptions.Timeout:
         print("Timeout lors de la récupération du calendrier. Le serveur met trop de temps à répondre.")
@@ -105,9 +338,287 @@ def get_calendar_data(cookie, student_number, range='year'):
     except requests.exceptions.RequestException as e:
         print(f"Erreur lors de la récupération du calendrier: {e}")
         return None
-    finally:
-        if 'session' in locals():
-            session.close()
+
+def split_date_range(start_date, end_date, window='month'):
+    """
+    Découpe une plage de dates en fenêtres d'une semaine ou d'un mois calendaire
+    
+    Chaque fenêtre se termine au début de la suivante : le jour commun est récupéré deux fois
+    et les doublons sont retirés par merge_events, quelle que soit l'interprétation de 'end'
+    par le serveur.
+    
+    Returns:
+        list: Liste de tuples (start_date_str, end_date_str)
+    """
+    if window not in ('week', 'month'):
+        raise ValueError("Window must be 'week' or 'month'")
+    
+    windows = []
+    current = datetime(start_date.year, start_date.month, start_date.day)
+    while current <= end_date:
+        if window == 'week':
+            next_start = current + timedelta(days=7)
+        else:
+            next_start = (current.replace(day=1) + timedelta(days=32)).replace(day=1)
+        window_end = min(next_start, end_date)
+        windows.append((current.strftime('%Y-%m-%d'), window_end.strftime('%Y-%m-%d')))
+        current = next_start
+    return windows
+
+def event_key(event):
+    """
+    Identifiant d'un événement CY pour la déduplication
+    """
+    if event.get('id'):
+        return event['id']
+    return (event.get('start'), event.get('end'), event.get('description'))
+
+def merge_events(event_lists):
+    """
+    Fusionne plusieurs listes d'événements en retirant les doublons, triées par date de début
+    """
+    merged = {}
+    for events in event_lists:
+        for event in events:
+            merged.setdefault(event_key(event), event)
+    return sorted(merged.values(), key=lambda event: event.get('start') or '')
+
+def fetch_calendar_windows(cookie, student_number, windows, max_workers=4, max_rounds=3):
+    """
+    Récupère plusieurs fenêtres de dates en parallèle sur le client HTTP partagé
+    
+    Seules les fenêtres en échec sont redemandées à chaque nouveau tour.
+    
+    Args:
+        windows: Liste de tuples (start_date_str, end_date_str)
+        max_workers: Nombre maximal de requêtes simultanées
+        max_rounds: Nombre maximal de tentatives par fenêtre
+        
+    Returns:
+        list: Les événements fusionnés, ou None si une fenêtre n'a pas pu être récupérée
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    results = {}
+    pending = list(windows)
+    session = get_shared_session()
+    max_workers = min(max_workers, SHARED_POOL_SIZE)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for round_number in range(1, max_rounds + 1):
+            futures = {
+                window: executor.submit(post_calendar_request, session, cookie, student_number, *window)
+                for window in pending
+            }
+            failed = []
+            for window, future in futures.items():
+                try:
+                    results[window] = future.result()
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    print(f"✗ Fenêtre {window[0]} → {window[1]} échouée (tour {round_number}/{max_rounds}): {e}")
+                    failed.append(window)
+            
+            print(f"Tour {round_number}: {len(pending) - len(failed)}/{len(pending)} fenêtres récupérées")
+            pending = failed
+            if not pending:
+                break
+    
+    if pending:
+        print(f"Erreur: {len(pending)} fenêtre(s) impossible(s) à récupérer")
+        return None
+    
+    return merge_events(results[window] for window in windows)
+
+def chunk_list(items, size):
+    """
+    Découpe une liste en lots de taille maximale size
+    """
+    return [items[index:index + size] for index in range(0, len(items), size)]
+
+def get_federation_field():
+    """
+    Champ des événements indiquant à quel étudiant (ressource de fédération) ils appartiennent
+    (variable CY_FEDERATION_FIELD, vide par défaut)
+
+    Les réponses GetCalendarData observées jusqu'ici n'en ont aucun : le champ n'est à
+    renseigner qu'après l'avoir constaté dans une vraie réponse à plusieurs federationIds.
+    """
+    return os.getenv('CY_FEDERATION_FIELD', '').strip()
+
+def event_federation_ids(event, field):
+    """
+    Retourne les identifiants de fédération présents dans un événement (ensemble vide si absents)
+    """
+    value = event.get(field)
+    if value is None:
+        return set()
+    values = value if isinstance(value, list) else [value]
+    return {str(item) for item in values if item is not None}
+
+def split_events_by_student(events, student_numbers, field):
+    """
+    Répartit la réponse d'une requête groupée entre les étudiants demandés
+    
+    Args:
+        field: Champ des événements contenant l'étudiant (voir get_federation_field)
+    
+    Returns:
+        dict: {numéro étudiant: événements}, ou None si un événement ne peut pas être attribué
+    """
+    per_student = {str(number): [] for number in student_numbers}
+    for event in events:
+        owners = event_federation_ids(event, field) & per_student.keys()
+        if not owners:
+            return None
+        for owner in owners:
+            per_student[owner].append(event)
+    return per_student
+
+def get_calendar_data_batch(cookie, student_numbers, range='year', batch_size=None):
+    """
+    Récupère les calendriers de plusieurs étudiants en regroupant les numéros dans chaque requête
+    
+    Le regroupement n'est pas vérifié sur le serveur CY et reste désactivé par défaut : il
+    suppose que chaque événement indique son étudiant dans le champ CY_FEDERATION_FIELD. Si un
+    événement ne peut pas être attribué, le lot est redemandé étudiant par étudiant.
+    
+    Args:
+        cookie: Cookie d'authentification
+        student_numbers: Liste de numéros étudiants
+        range: Plage de dates ('year', 'month', 'week')
+        batch_size: Nombre d'étudiants par requête (CY_BATCH_SIZE, 1 par défaut)
+        
+    Returns:
+        dict: {numéro étudiant: liste des événements, ou None en cas d'erreur}
+    """
+    batch_size = batch_size or int(os.getenv('CY_BATCH_SIZE', 1))
+    federation_field = get_federation_field()
+    if batch_size > 1 and not federation_field:
+        print("CY_FEDERATION_FIELD non défini, récupération étudiant par étudiant")
+        batch_size = 1
+    start_date, end_date = get_date_range(range)
+    start_date_str = start_date.strftime('%Y-%m-%d')
+    end_date_str = end_date.strftime('%Y-%m-%d')
+    
+    student_numbers = [str(number) for number in student_numbers]
+    results = {}
+    # Désactivé dès qu'une réponse groupée ne peut pas être attribuée, pour ne pas payer deux fois
+    batching_supported = True
+    session = get_shared_session()
+    
+    for batch_index, batch in enumerate(chunk_list(student_numbers, batch_size), 1):
+        per_student = None
+        
+        if len(batch) > 1 and batching_supported:
+            try:
+                events = post_calendar_request(session, cookie, batch, start_date_str, end_date_str)
+                per_student = split_events_by_student(events, batch, federation_field)
+                if per_student is None:
+                    print(f"Réponse groupée non attribuable (champ '{federation_field}' absent), récupération individuelle")
+                    batching_supported = False
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"✗ Erreur lors de la récupération du lot {batch_index}: {e}")
+        
+        if per_student is None:
+            per_student = {}
+            for number in batch:
+                try:
+                    per_student[number] = post_calendar_request(session, cookie, number, start_date_str, end_date_str)
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    print(f"✗ Erreur lors de la récupération du calendrier de {number}: {e}")
+                    per_student[number] = None
+        
+        results.update(per_student)
+        print(f"Progression: {len(results)}/{len(student_numbers)} calendriers récupérés")
+    
+    return results
+
+def save_calendar_json(events_data, output_file='cy_calendar.json'):
+    """
+    Sauvegarde la réponse brute de GetCalendarData pour une conversion ultérieure
+    
+    Returns:
+        str: Chemin du fichier JSON créé
+    """
+    os.makedirs(GENERATED_DIR, exist_ok=True)
+    output_path = os.path.join(GENERATED_DIR, output_file)
+    
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(events_data, f, ensure_ascii=False)
+    
+    print(f"Fichier JSON créé avec succès: {output_path} ({len(events_data)} événements)")
+    return output_path
+
+def load_calendar_json(input_path):
+    """
+    Charge des données de calendrier sauvegardées par save_calendar_json
+    """
+    with open(input_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def iter_json_array(f, chunk_size=64 * 1024):
+    """
+    Décode un tableau JSON élément par élément depuis un fichier texte, sans le charger en entier
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+    started = False
+    
+    while True:
+        while pos < len(buffer) and buffer[pos].isspace():
+            pos += 1
+        
+        if pos < len(buffer):
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError("Le fichier JSON ne contient pas un tableau d'événements")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                while end < len(buffer) and buffer[end].isspace():
+                    end += 1
+                # Un élément n'est complet que s'il est suivi d'un séparateur (ex: nombre tronqué)
+                if end < len(buffer) and buffer[end] in ',]':
+                    yield item
+                    pos = end + 1 if buffer[end] == ',' else end
+                    continue
+                if eof:
+                    raise ValueError("Séparateur manquant dans le tableau JSON")
+        elif eof:
+            raise ValueError("Fin de fichier inattendue dans le tableau JSON")
+        
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+def iter_calendar_json(input_path):
+    """
+    Parcourt les événements d'un JSON sauvegardé par save_calendar_json un par un
+    
+    Utilise ijson s'il est installé, sinon un décodeur incrémental basé sur le module json.
+    """
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+    
+    if ijson:
+        with open(input_path, 'rb') as f:
+            yield from ijson.items(f, 'item', use_float=True)
+    else:
+        with open(input_path, 'r', encoding='utf-8') as f:
+            yield from iter_json_array(f)
 
 def clean_text(text):
     """
@@ -127,27 +638,29 @@ def clean_text(text):
 def extract_clean_lines(description):
     """
     Extrait les lignes d'une description en respectant les balises <br> et en nettoyant le texte
-    """
-    # Remplace toutes les variantes de <br> par un séparateur unique
-    description = re.sub(r'<br\s*\/?>(\s*<br\s*\/?>)*', '|LINEBREAK|', description)
-    
-    # Supprime les autres balises HTML
-    description = re.sub(r'<[^>]*>', '', description)
-    
-    # Décode les entités HTML
-    description = html.unescape(description)
-    
-    # Divise par le séparateur unique
-    lines = description.split('|LINEBREAK|')
-    
-    # Nettoie chaque ligne
-    lines = [line.strip() for line in lines if line.strip()]
     
+    La description est découpée en une seule passe sur les <br> (expression compilée au chargement
+    du module). Les autres balises et les entités HTML, rares, ne sont traitées que dans les
+    lignes qui en contiennent.
+    """
+    lines = []
+    for line in LINE_BREAK_PATTERN.split(description):
+        if '<' in line:
+            line = TAG_PATTERN.sub('', line)
+        if '&' in line:
+            line = html.unescape(line)
+        line = line.strip()
+        if line:
+            lines.append(line)
     return lines
 
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
 def parse_description(description):
     """
     Parse la description des événements pour extraire les informations importantes
+    
+    Un cours hebdomadaire revient avec exactement la même description tout le semestre : le
+    résultat (un tuple, donc non modifiable) est mis en cache sur la description brute.
     """
     lines = extract_clean_lines(description)
     
@@ -162,6 +675,19 @@ def parse_description(description):
     else:
         return parse_regular_description(lines)
 
+def report_parse_cache():
+    """
+    Affiche les compteurs du cache de parse_description
+
+    À appeler depuis le thread principal une fois les événements convertis : un appel depuis
+    le thread d'écriture ICS se mêlerait aux messages de l'import Google.
+    """
+    info = parse_description.cache_info()
+    total = info.hits + info.misses
+    if total:
+        print(f"Descriptions: {info.hits}/{total} trouvées en cache ({info.hits / total:.0%}), "
+              f"{info.currsize} distinctes en mémoire")
+
 def parse_regular_description(lines):
     """
     Parse la description d'un cours normal
@@ -197,7 +723,7 @@ def parse_rattrapage_description(lines):
     
     # Essaye de trouver les groupes et la salle
     for i, line in enumerate(lines[1:], 1):
-        if "SALLE" in line or "Amphi" in line or any(bldg in line for bldg in ["FER", "CAU", "TUR", "CON"]):
+        if ROOM_PATTERN.search(line):
             room_index = i
             location = line
             break
@@ -240,120 +766,156 @@ def parse_rattrapage_description(lines):
     
     return event_type, group, "", location, professor, True, exam_subject, ""
 
-def escape_ical_chars(text):
+def is_reference_writer_enabled():
     """
-    Échappe correctement les caractères spéciaux pour le format iCalendar selon RFC 5545
+    Indique si les VEVENT sont construits avec icalendar (CY_ICS_WRITER=icalendar) plutôt que
+    par l'écriture directe de src.ics_writer, plus rapide
     """
-    if not text:
-        return ""
-    
-    # Échappe les caractères spéciaux dans l'ordre correct
-    text = text.replace('\\', '\\\\')  # Backslash doit être échappé en premier
-    text = text.replace(';', '\\;')    # Point-virgule
-    text = text.replace(',', '\\,')    # Virgule
-    text = text.replace('\n', '\\n')   # Saut de ligne
-    
-    return text
+    return os.getenv('CY_ICS_WRITER', 'direct').lower() == 'icalendar'
 
-def create_ics_file(events_data, output_file='cy_calendar.ics'):
+def build_ics_event(course, paris_tz, uid=None):
     """
-    Crée un fichier ICS à partir des données du calendrier
+    Construit le VEVENT d'un événement avec icalendar (implémentation de référence)
+    
+    Args:
+        course: CourseEvent à écrire
+        paris_tz: Fuseau horaire pytz Europe/Paris
+        uid: UID à utiliser à la place de course.uid
     """
-    # Crée le répertoire de sortie si nécessaire
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    output_dir = os.path.join(script_dir, 'generated')
-    os.makedirs(output_dir, exist_ok=True)
+    from icalendar import Event
     
-    output_path = os.path.join(output_dir, output_file)
+    event = Event()
     
-    cal = Calendar()
-    cal.add('prodid', '-//CY University Calendar//FR')
-    cal.add('version', '2.0')
+    # Ajoute les propriétés à l'événement
+    event.add('summary', course.summary)
+    event.add('location', course.location)
+    event.add('description', course.description)
     
-    paris_tz = pytz.timezone('Europe/Paris')
+    # Ajoute les propriétés supplémentaires
+    if course.background_color is not None:
+        event.add('X-ORIGINAL-BG-COLOR', course.background_color)
     
-    events_count = 0
+    # Ajoute le fuseau horaire
+    event.add('dtstart', paris_tz.localize(course.start))
+    event.add('dtend', paris_tz.localize(course.end))
+    
+    # Ajoute le type d'événement
+    event.add('X-EVENT-TYPE', course.category)
+    
+    # UID stable d'une exécution à l'autre et empreinte du contenu
+    event.add('uid', uid or course.uid)
+    event.add('X-CYCALENDAR-FINGERPRINT', course.fingerprint)
+    
+    return event
+
+def iter_course_events(events_data):
+    """
+    Convertit les événements bruts de GetCalendarData en CourseEvent, un par un
+    
+    Les événements invalides sont ignorés. Deux événements de même identité sans identifiant CY
+    reçoivent des UID distincts (et toujours déterministes).
+    
+    Args:
+        events_data: Événements bruts de GetCalendarData ou objets CourseEvent
+    """
+    from src.course_event import CourseEvent
+    
+    seen_uids = set()
     for event_data in events_data:
         try:
-            event = Event()
-            
-            # Parse la description pour extraire les informations
-            event_type, group, subject, location, professor, is_rattrapage, exam_subject, name = parse_description(event_data['description'])
-            
-            # Crée le résumé et la description selon le type d'événement
-            if is_rattrapage:
-                if exam_subject:
-                    if "rattrapage" in exam_subject.lower():
-                        summary = exam_subject
-                    else:
-                        summary = f"Rattrapage {exam_subject}"
-                else:
-                    summary = f"{event_type}"
-                
-                if professor:
-                    description = f"{group}\nMatière: {exam_subject or 'Non spécifiée'}\nProfesseur: {professor}"
-                else:
-                    description = f"{group}\nMatière: {exam_subject or 'Non spécifiée'}"
+            if isinstance(event_data, CourseEvent):
+                course = event_data
             else:
-                if not subject.strip():
-                    summary = f"{group} - {event_type}"
-                else:
-                    summary = f"{subject} - {event_type}"
-                
-                description = f"{group}\nProfesseur: {professor}"
-            
-            # Ajoute les propriétés à l'événement
-            event.add('summary', summary)
-            event.add('location', location)
-            event.add('description', description)
-            
-            # Ajoute les propriétés supplémentaires
-            if 'backgroundColor' in event_data:
-                event.add('X-ORIGINAL-BG-COLOR', event_data['backgroundColor'])
-            
-            try:
-                # Parse les dates et heures
-                start = datetime.strptime(event_data['start'], '%Y-%m-%dT%H:%M:%S')
-                if not event_data.get('end'):
-                    end = start + timedelta(hours=2)
-                else:
-                    end = datetime.strptime(event_data['end'], '%Y-%m-%dT%H:%M:%S')
-                
-                # Ajoute le fuseau horaire
-                start = paris_tz.localize(start)
-                end = paris_tz.localize(end)
-                
-                event.add('dtstart', start)
-                event.add('dtend', end)
-                
-                # Ajoute le type d'événement
-                if is_rattrapage:
-                    event.add('X-EVENT-TYPE', 'rattrapage')
-                else:
-                    event.add('X-EVENT-TYPE', event_type)
-                
-                # Ajoute un UID unique
-                event.add('uid', str(uuid.uuid4()))
-                
-                cal.add_component(event)
-                events_count += 1
-                
-            except (ValueError, TypeError) as e:
-                print(f"Erreur avec les dates de l'événement: {e}")
-                continue
-            
+                course = CourseEvent.from_cy_event(event_data)
+        except (ValueError, TypeError) as e:
+            print(f"Erreur avec les dates de l'événement: {e}")
+            continue
         except Exception as e:
             print(f"Erreur lors du traitement d'un événement: {e}")
             continue
+        
+        if course.uid in seen_uids and course is event_data:
+            # Un CourseEvent reçu peut être partagé (calendriers d'une promo) : il n'est pas modifié
+            course = copy.copy(course)
+        occurrence = 1
+        while course.uid in seen_uids:
+            occurrence += 1
+            course.uid = course.make_uid(occurrence)
+        seen_uids.add(course.uid)
+        yield course
+
+def build_course_events(events_data):
+    """
+    Returns:
+        list: Les CourseEvent des événements, à transmettre directement à l'import Google
+    """
+    return list(iter_course_events(events_data))
+
+def start_ics_writer(courses, output_file='cy_calendar.ics'):
+    """
+    Écrit le fichier ICS dans un thread séparé, pendant que les événements sont importés
+    
+    Args:
+        courses: Liste de CourseEvent (voir build_course_events), qui n'est pas modifiée
+    
+    Returns:
+        threading.Thread: Le thread d'écriture, à attendre avec join()
+    """
+    thread = threading.Thread(target=create_ics_file, args=(courses, output_file), name='ics-writer')
+    thread.start()
+    return thread
+
+def create_ics_file(events_data, output_file='cy_calendar.ics'):
+    """
+    Crée un fichier ICS à partir des données du calendrier
+    
+    Chaque VEVENT est écrit dans le fichier dès qu'il est construit : events_data peut être
+    un générateur (voir iter_calendar_json) et la mémoire utilisée ne dépend pas du nombre
+    d'événements.
+    
+    Args:
+        events_data: Événements bruts de GetCalendarData ou objets CourseEvent
+    """
+    # Crée le répertoire de sortie si nécessaire
+    os.makedirs(GENERATED_DIR, exist_ok=True)
+    
+    output_path = os.path.join(GENERATED_DIR, output_file)
+    # Écrit dans un fichier temporaire pour ne pas laisser un ICS incomplet en cas d'erreur
+    temp_path = f'{output_path}.tmp'
+    
+    use_icalendar = is_reference_writer_enabled()
+    if use_icalendar:
+        import pytz
+        paris_tz = pytz.timezone('Europe/Paris')
+    
+    events_count = 0
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(ICS_HEADER.encode('utf-8'))
+            for course in iter_course_events(events_data):
+                try:
+                    if use_icalendar:
+                        f.write(build_ics_event(course, paris_tz).to_ical())
+                    else:
+                        f.write(format_vevent(course).encode('utf-8'))
+                    events_count += 1
+                except Exception as e:
+                    print(f"Erreur lors du traitement d'un événement: {e}")
+                    continue
+            f.write(ICS_FOOTER.encode('utf-8'))
+    except (OSError, ValueError) as e:
+        # Fichier JSON source illisible ou tronqué pendant la lecture en continu
+        print(f"Erreur lors de l'écriture du fichier ICS: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return None
     
     if events_count == 0:
+        os.remove(temp_path)
         print("Aucun événement n'a pu être traité!")
         return None
     
-    # Écrit le fichier ICS
-    with open(output_path, 'wb') as f:
-        f.write(cal.to_ical())
-    
+    os.replace(temp_path, output_path)
     print(f"Fichier ICS créé avec succès: {output_path} ({events_count} événements)")
     return output_path
 
@@ -362,48 +924,14 @@ def parse_ics_to_json(ics_file):
     Convertit un fichier ICS en format JSON
     Utile pour importer des données ICS vers une autre API
     """
-    events_data = []
+    from icalendar import Calendar
+    from src.course_event import CourseEvent
     
     try:
         with open(ics_file, 'rb') as f:
             cal = Calendar.from_ical(f.read())
-            
-            for component in cal.walk():
-                if component.name == "VEVENT":
-                    event = {}
-                    
-                    # Récupère les propriétés de base
-                    if component.get('summary'):
-                        event['summary'] = str(component.get('summary'))
-                    
-                    if component.get('description'):
-                        event['description'] = str(component.get('description'))
-                    
-                    if component.get('location'):
-                        event['location'] = str(component.get('location'))
-                    
-                    if component.get('dtstart'):
-                        start = component.get('dtstart').dt
-                        if isinstance(start, datetime):
-                            event['start'] = start.strftime('%Y-%m-%dT%H:%M:%S')
-                        else:
-                            event['start'] = datetime.combine(start, datetime.min.time()).strftime('%Y-%m-%dT%H:%M:%S')
-                    
-                    if component.get('dtend'):
-                        end = component.get('dtend').dt
-                        if isinstance(end, datetime):
-                            event['end'] = end.strftime('%Y-%m-%dT%H:%M:%S')
-                        else:
-                            event['end'] = datetime.combine(end, datetime.min.time()).strftime('%Y-%m-%dT%H:%M:%S')
-                    
-                    # Récupère les propriétés personnalisées
-                    if component.get('X-ORIGINAL-BG-COLOR'):
-                        event['backgroundColor'] = str(component.get('X-ORIGINAL-BG-COLOR'))
-                    
-                    if component.get('X-EVENT-TYPE'):
-                        event['eventCategory'] = str(component.get('X-EVENT-TYPE'))
-                    
-                    events_data.append(event)
+        
+        events_data = [CourseEvent.from_ical(component).to_dict() for component in cal.walk('VEVENT')]
         
         print(f"{len(events_data)} événements extraits du fichier ICS")
         return events_data
@@ -413,10 +941,11 @@ def parse_ics_to_json(ics_file):
         return None
 
 if __name__ == "__main__":
-    from auth import get_auth_info
+    from src.auth import get_auth_info
     
     cookie, student_id = get_auth_info()
     if cookie and student_id:
         events_data = get_calendar_data(cookie, student_id)
         if events_data:
-            create_ics_file(events_data)
\ No newline at end of file
+            create_ics_file(events_data)
+            report_parse_cache()
\ No newline at end of file
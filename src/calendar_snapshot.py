@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import hashlib
+from datetime import datetime, timedelta
+from src.calendar_converter import fetch_calendar_range, merge_events, split_date_range
+from src.session_cache import CACHE_DIR
+
+# Nombre de jours passés toujours redemandés (modifications de dernière minute)
+DEFAULT_HOT_DAYS = 7
+# Une récupération complète est refaite au moins tous les N jours pour les modifications tardives
+DEFAULT_FULL_REFRESH_DAYS = 7
+
+def get_snapshot_path(student_number):
+    return os.path.join(CACHE_DIR, f'calendar_snapshot_{student_number}.json')
+
+def window_fingerprint(events):
+    """
+    Empreinte du contenu d'une fenêtre, indépendante de l'ordre des événements
+    """
+    serialized = json.dumps(sorted(events, key=lambda event: json.dumps(event, sort_keys=True)), sort_keys=True)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+def load_snapshot(student_number):
+    """
+    Returns:
+        dict: La dernière récupération sauvegardée, ou None
+    """
+    path = get_snapshot_path(student_number)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Snapshot du calendrier illisible, récupération complète: {e}")
+        return None
+
+def save_snapshot(student_number, snapshot):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(get_snapshot_path(student_number), 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+    except OSError as e:
+        print(f"⚠️ Impossible de sauvegarder le snapshot du calendrier: {e}")
+
+def build_windows(events, windows):
+    """
+    Range les événements dans les fenêtres mensuelles selon leur date de début
+
+    Returns:
+        dict: {début de fenêtre: {'end', 'fingerprint', 'events'}}
+    """
+    starts = [window_start for window_start, _ in windows]
+    buckets = {window_start: [] for window_start in starts}
+    for event in events:
+        event_day = (event.get('start') or '')[:10]
+        # Dernière fenêtre commençant avant l'événement
+        target = starts[0]
+        for window_start in starts:
+            if window_start <= event_day:
+                target = window_start
+            else:
+                break
+        buckets[target].append(event)
+
+    return {
+        window_start: {
+            'end': window_end,
+            'fingerprint': window_fingerprint(buckets[window_start]),
+            'events': buckets[window_start],
+        }
+        for window_start, window_end in windows
+    }
+
+def get_incremental_calendar_data(cookie, student_number, start_date, end_date, chunk=''):
+    """
+    Récupère le calendrier en ne redemandant que la fenêtre "chaude" (les derniers jours
+    jusqu'à l'horizon) et en réutilisant les mois passés de la récupération précédente
+
+    Variables d'environnement : CY_HOT_DAYS (7 par défaut), CY_FULL_REFRESH_DAYS (7 par défaut)
+
+    Returns:
+        list: Les événements, ou None en cas d'erreur
+    """
+    hot_days = int(os.getenv('CY_HOT_DAYS', DEFAULT_HOT_DAYS))
+    full_refresh_days = float(os.getenv('CY_FULL_REFRESH_DAYS', DEFAULT_FULL_REFRESH_DAYS))
+
+    windows = split_date_range(start_date, end_date, 'month')
+    range_start = windows[0][0]
+    hot_start = (datetime.now() - timedelta(days=hot_days)).strftime('%Y-%m-%d')
+
+    snapshot = load_snapshot(student_number)
+    full_refresh = (
+        not snapshot
+        or snapshot.get('range_start') != range_start
+        or time.time() - snapshot.get('last_full_refresh', 0) > full_refresh_days * 86400
+    )
+
+    # Mois entièrement terminés avant la fenêtre chaude et présents dans le snapshot
+    cold_windows = []
+    if not full_refresh:
+        for window_start, window_end in windows:
+            if window_end > hot_start or window_start not in snapshot['windows']:
+                break
+            cold_windows.append(window_start)
+
+    if cold_windows:
+        fetch_start = datetime.strptime(snapshot['windows'][cold_windows[-1]]['end'], '%Y-%m-%d')
+        print(f"Récupération incrémentale: {len(cold_windows)} mois réutilisés, récupération à partir du {fetch_start.strftime('%Y-%m-%d')}")
+    else:
+        fetch_start = start_date
+        print("Récupération complète du calendrier")
+
+    fetched = fetch_calendar_range(cookie, student_number, fetch_start, end_date, chunk)
+    if fetched is None:
+        return None
+
+    cold_events = [event for window_start in cold_windows for event in snapshot['windows'][window_start]['events']]
+    events = merge_events([cold_events, fetched])
+
+    new_windows = build_windows(events, windows)
+    if snapshot and not full_refresh:
+        changed = [
+            window_start for window_start, window in new_windows.items()
+            if window_start not in cold_windows
+            and snapshot['windows'].get(window_start, {}).get('fingerprint') != window['fingerprint']
+        ]
+        print(f"{len(changed)} fenêtre(s) modifiée(s) depuis la dernière récupération: {', '.join(changed) or '-'}")
+
+    save_snapshot(student_number, {
+        'student_number': str(student_number),
+        'range_start': range_start,
+        'last_full_refresh': time.time() if full_refresh else snapshot['last_full_refresh'],
+        'windows': new_windows,
+    })
+    return events
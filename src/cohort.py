@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import requests
+from src.calendar_converter import (
+    GROUP_RES_TYPE, event_key, get_shared_session, get_date_range,
+    parse_description, post_calendar_request
+)
+from src.course_event import CourseEvent
+from src.session_cache import CACHE_DIR
+
+MEMBERSHIPS_PATH = os.path.join(CACHE_DIR, 'group_memberships.json')
+
+# Les groupes d'un étudiant sont redécouverts au plus tard au bout de ce délai
+DEFAULT_MEMBERSHIP_MAX_AGE_DAYS = 30
+
+def extract_event_groups(event):
+    """
+    Retourne le groupe (TD/TP) d'un cours CY à partir de sa description
+
+    Seuls les cours normaux indiquent un groupe dont l'étudiant fait partie : un rattrapage ou
+    un examen commun liste tous les groupes concernés, qui ne sont pas forcément les siens.
+    """
+    _, group, _, _, _, is_rattrapage, _, _ = parse_description(event.get('description', ''))
+    if is_rattrapage or not group.strip():
+        return []
+    return [group.strip()]
+
+def load_memberships():
+    """
+    Returns:
+        dict: {numéro étudiant: {'groups': [...], 'saved_at': timestamp}}
+    """
+    if not os.path.exists(MEMBERSHIPS_PATH):
+        return {}
+    try:
+        with open(MEMBERSHIPS_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Fichier des groupes illisible, les groupes seront redécouverts: {e}")
+        return {}
+
+def save_memberships(memberships):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(MEMBERSHIPS_PATH, 'w', encoding='utf-8') as f:
+            json.dump(memberships, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"⚠️ Impossible de sauvegarder les groupes: {e}")
+
+class CohortCalendarBuilder:
+    """
+    Construit les calendriers d'une promo en ne récupérant qu'une fois l'emploi du temps de
+    chaque groupe partagé
+
+    1. Les groupes de chaque étudiant sont connus depuis .cache/group_memberships.json, ou
+       découverts une fois à partir de son propre calendrier
+    2. L'emploi du temps de chaque groupe distinct est récupéré et analysé une seule fois
+       (parsed_by_group)
+    3. Le calendrier d'un étudiant est l'union des CourseEvent de ses groupes, partagés entre
+       étudiants et transmis tels quels à create_ics_file ou import_to_google_calendar(events=...)
+
+    Le travail dépend donc du nombre de groupes distincts et non du nombre d'étudiants.
+    """
+    def __init__(self, cookie, range='year'):
+        self.cookie = cookie
+        start_date, end_date = get_date_range(range)
+        self.start_date_str = start_date.strftime('%Y-%m-%d')
+        self.end_date_str = end_date.strftime('%Y-%m-%d')
+        self.memberships = load_memberships()
+        self.max_age = float(os.getenv('CY_MEMBERSHIP_MAX_AGE_DAYS', DEFAULT_MEMBERSHIP_MAX_AGE_DAYS)) * 86400
+        # {groupe: [(événement brut, CourseEvent)]}
+        self.parsed_by_group = {}
+        self.session = None
+
+    def discover_groups(self, student_number):
+        """
+        Récupère le calendrier de l'étudiant pour connaître ses groupes
+        """
+        events = post_calendar_request(
+            self.session, self.cookie, student_number, self.start_date_str, self.end_date_str
+        )
+        groups = sorted({group for event in events for group in extract_event_groups(event)})
+        self.memberships[str(student_number)] = {'groups': groups, 'saved_at': time.time()}
+        print(f"Groupes de {student_number}: {', '.join(groups) or 'aucun'}")
+        return groups
+
+    def get_student_groups(self, student_number):
+        membership = self.memberships.get(str(student_number))
+        if membership and time.time() - membership.get('saved_at', 0) <= self.max_age:
+            return membership['groups']
+        return self.discover_groups(student_number)
+
+    def fetch_group(self, group):
+        """
+        Récupère et analyse une seule fois l'emploi du temps d'un groupe
+        """
+        if group not in self.parsed_by_group:
+            events = post_calendar_request(
+                self.session, self.cookie, group, self.start_date_str, self.end_date_str,
+                res_type=GROUP_RES_TYPE
+            )
+            parsed_events = []
+            for event in events:
+                try:
+                    parsed_events.append((event, CourseEvent.from_cy_event(event)))
+                except (KeyError, ValueError, TypeError) as e:
+                    print(f"Événement ignoré dans le groupe {group}: {e}")
+            self.parsed_by_group[group] = parsed_events
+        return self.parsed_by_group[group]
+
+    def build(self, student_numbers):
+        """
+        Args:
+            student_numbers: Liste de numéros étudiants
+
+        Returns:
+            dict: {numéro étudiant: liste de CourseEvent triée par date, ou None en cas d'erreur}
+        """
+        self.session = get_shared_session()
+        student_groups = {}
+        calendars = {}
+
+        for student_number in student_numbers:
+            try:
+                student_groups[str(student_number)] = self.get_student_groups(student_number)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"✗ Impossible de déterminer les groupes de {student_number}: {e}")
+                calendars[str(student_number)] = None
+        save_memberships(self.memberships)
+
+        distinct_groups = sorted({group for groups in student_groups.values() for group in groups})
+        print(f"{len(student_groups)} étudiants, {len(distinct_groups)} groupes distincts à récupérer")
+
+        failed_groups = set()
+        for group in distinct_groups:
+            try:
+                self.fetch_group(group)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"✗ Erreur lors de la récupération du groupe {group}: {e}")
+                failed_groups.add(group)
+
+        for student_number, groups in student_groups.items():
+            if failed_groups.intersection(groups):
+                calendars[student_number] = None
+                continue
+            # Les événements déjà analysés sont partagés entre étudiants : aucune copie n'est faite
+            calendars[student_number] = [parsed for _, parsed in self.get_parsed_events(groups)]
+
+        return calendars
+
+    def get_parsed_events(self, groups):
+        """
+        Retourne les événements analysés d'un ensemble de groupes, sans doublon
+
+        Returns:
+            list: Liste de tuples (événement brut, CourseEvent), triée par date de début
+        """
+        seen = set()
+        parsed_events = []
+        for group in groups:
+            for event, parsed in self.parsed_by_group.get(group, []):
+                key = event_key(event)
+                if key not in seen:
+                    seen.add(key)
+                    parsed_events.append((event, parsed))
+        parsed_events.sort(key=lambda pair: pair[0].get('start') or '')
+        return parsed_events
+
+def get_cohort_calendar_data(cookie, student_numbers, range='year'):
+    """
+    Récupère les calendriers d'une promo en dédupliquant les emplois du temps de groupe
+
+    Returns:
+        dict: {numéro étudiant: liste de CourseEvent, ou None en cas d'erreur}
+    """
+    return CohortCalendarBuilder(cookie, range).build(student_numbers)
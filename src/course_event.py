@@ -0,0 +1,237 @@
+import sys
+import hashlib
+from datetime import datetime, timedelta
+from src.calendar_converter import parse_description
+
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+UID_DOMAIN = 'cycalendar'
+
+def intern_text(value):
+    """
+    Retourne une chaîne partagée pour les valeurs qui se répètent (groupes, salles, professeurs...)
+
+    Les propriétés icalendar sont des sous-classes de str, qui ne peuvent pas être internées telles quelles.
+    """
+    if not value:
+        return ''
+    return sys.intern(str(value))
+
+def format_datetime(value):
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    return value.strftime(DATETIME_FORMAT)
+
+class CourseEvent:
+    """
+    Événement de l'emploi du temps, transmis tel quel entre la récupération CY, le fichier ICS
+    et l'import Google Calendar
+
+    Les chaînes qui reviennent d'un événement à l'autre sont internées : un cours hebdomadaire
+    ne garde qu'une copie de son titre, de sa salle, de son groupe et de son professeur.
+
+    L'UID ne dépend que de l'identité de l'événement (identifiant CY, ou à défaut début, groupe
+    et matière) et reste donc le même d'une exécution à l'autre. L'empreinte (fingerprint) ne
+    dépend que de son contenu : un UID connu avec une autre empreinte est un événement modifié.
+
+    Les textes issus de la réponse CY sont déjà décodés par extract_clean_lines ; seuls ceux lus
+    dans un fichier ICS (html_decoded=False) peuvent encore contenir des entités HTML.
+    """
+    __slots__ = (
+        'summary', 'description', 'location', 'start', 'end', 'category', 'event_type',
+        'group', 'subject', 'professor', 'is_rattrapage', 'exam_subject', 'background_color',
+        'source_id', 'uid', 'fingerprint', 'html_decoded',
+    )
+
+    def __init__(self, summary, description, location, start, end, category='', event_type='',
+                 group='', subject='', professor='', is_rattrapage=False, exam_subject='',
+                 background_color=None, source_id=None, uid=None, fingerprint=None, html_decoded=False):
+        self.summary = intern_text(summary)
+        self.description = intern_text(description)
+        self.location = intern_text(location)
+        self.start = start
+        self.end = end
+        # Valeur de X-EVENT-TYPE : 'rattrapage' ou le type du cours (CM, TD, TP...)
+        self.category = intern_text(category)
+        self.event_type = intern_text(event_type)
+        self.group = intern_text(group)
+        self.subject = intern_text(subject)
+        self.professor = intern_text(professor)
+        self.is_rattrapage = is_rattrapage
+        self.exam_subject = intern_text(exam_subject)
+        self.background_color = intern_text(background_color) if background_color is not None else None
+        self.source_id = str(source_id) if source_id else None
+        self.uid = str(uid) if uid else self.make_uid()
+        self.fingerprint = str(fingerprint) if fingerprint else self.make_fingerprint()
+        self.html_decoded = html_decoded
+
+    def identity(self):
+        """
+        Identité de l'événement : l'identifiant CY, sinon le début, le groupe et la matière
+        """
+        if self.source_id:
+            return f"cy:{self.source_id}"
+        start = format_datetime(self.start) if self.start else ''
+        subject = self.subject or self.exam_subject or self.event_type or self.summary
+        return f"{start}|{self.group}|{subject}"
+
+    def make_uid(self, occurrence=1):
+        """
+        UID déterministe dérivé de l'identité de l'événement
+
+        Args:
+            occurrence: Rang de l'événement parmi ceux de même identité (doublons sans identifiant CY)
+        """
+        identity = self.identity()
+        if occurrence > 1:
+            identity = f"{identity}#{occurrence}"
+        return f"{hashlib.sha1(identity.encode('utf-8')).hexdigest()}@{UID_DOMAIN}"
+
+    def make_fingerprint(self):
+        """
+        Empreinte du contenu visible de l'événement
+        """
+        content = '\x1f'.join([
+            self.summary, self.description, self.location,
+            format_datetime(self.start) if self.start else '',
+            format_datetime(self.end) if self.end else '',
+            self.category, self.background_color or '',
+        ])
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+
+    @classmethod
+    def from_cy_event(cls, event_data):
+        """
+        Construit l'événement à partir d'un élément de la réponse GetCalendarData
+
+        Raises:
+            ValueError, TypeError: Si les dates de l'événement sont invalides
+        """
+        event_type, group, subject, location, professor, is_rattrapage, exam_subject, name = parse_description(event_data['description'])
+
+        # Crée le résumé et la description selon le type d'événement
+        if is_rattrapage:
+            if exam_subject:
+                if "rattrapage" in exam_subject.lower():
+                    summary = exam_subject
+                else:
+                    summary = f"Rattrapage {exam_subject}"
+            else:
+                summary = f"{event_type}"
+
+            if professor:
+                description = f"{group}\nMatière: {exam_subject or 'Non spécifiée'}\nProfesseur: {professor}"
+            else:
+                description = f"{group}\nMatière: {exam_subject or 'Non spécifiée'}"
+        else:
+            if not subject.strip():
+                summary = f"{group} - {event_type}"
+            else:
+                summary = f"{subject} - {event_type}"
+
+            description = f"{group}\nProfesseur: {professor}"
+
+        # Parse les dates et heures (heure de Paris, sans fuseau)
+        start = datetime.strptime(event_data['start'], DATETIME_FORMAT)
+        if not event_data.get('end'):
+            end = start + timedelta(hours=2)
+        else:
+            end = datetime.strptime(event_data['end'], DATETIME_FORMAT)
+
+        return cls(
+            summary, description, location, start, end,
+            category='rattrapage' if is_rattrapage else event_type,
+            event_type=event_type, group=group, subject=subject, professor=professor,
+            is_rattrapage=is_rattrapage, exam_subject=exam_subject,
+            background_color=event_data.get('backgroundColor'), source_id=event_data.get('id'),
+            html_decoded=True,
+        )
+
+    @classmethod
+    def from_ical(cls, component):
+        """
+        Construit l'événement à partir d'un VEVENT lu dans un fichier ICS
+        """
+        dtstart = component.get('dtstart')
+        dtend = component.get('dtend')
+        category = component.get('X-EVENT-TYPE', '')
+        background_color = component.get('X-ORIGINAL-BG-COLOR')
+        return cls(
+            component.get('summary', ''),
+            component.get('description', ''),
+            component.get('location', ''),
+            dtstart.dt if dtstart else None,
+            dtend.dt if dtend else None,
+            category=category,
+            is_rattrapage=str(category) == 'rattrapage',
+            background_color=background_color,
+            uid=component.get('uid'),
+            fingerprint=component.get('X-CYCALENDAR-FINGERPRINT'),
+        )
+
+    def to_google_body(self):
+        """
+        Returns:
+            dict: Corps des requêtes events().import_, insert et update de l'API Google Calendar
+        """
+        from src.google_calendar import (
+            FINGERPRINT_PROPERTY, MANAGED_PROPERTY, SOURCE_KEY_PROPERTY,
+            clean_event_summary, decode_html_entities, get_event_color
+        )
+
+        # Nettoyer le titre de l'événement et, pour un événement lu dans un fichier ICS, décoder
+        # les entités HTML (un second décodage modifierait un texte contenant « &amp;lt; »)
+        decode = (lambda text: text) if self.html_decoded else decode_html_entities
+        summary = decode(clean_event_summary(self.summary))
+
+        body = {
+            'summary': summary,
+            'location': decode(self.location),
+            'description': decode(self.description),
+            'start': {
+                'dateTime': self.start.isoformat(),
+                'timeZone': 'Europe/Paris',
+            },
+            'end': {
+                'dateTime': self.end.isoformat(),
+                'timeZone': 'Europe/Paris',
+            },
+            # Permet de retrouver l'événement et de savoir s'il a changé lors de la synchronisation suivante
+            'extendedProperties': {
+                'private': {
+                    MANAGED_PROPERTY: '1',
+                    SOURCE_KEY_PROPERTY: self.uid,
+                    FINGERPRINT_PROPERTY: self.fingerprint,
+                }
+            }
+        }
+
+        # Définir la couleur selon le type d'événement
+        color_id = get_event_color(summary)
+        if color_id:
+            body['colorId'] = color_id
+
+        return body
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: L'événement au format JSON de parse_ics_to_json
+        """
+        event = {}
+        if self.summary:
+            event['summary'] = self.summary
+        if self.description:
+            event['description'] = self.description
+        if self.location:
+            event['location'] = self.location
+        if self.start:
+            event['start'] = format_datetime(self.start)
+        if self.end:
+            event['end'] = format_datetime(self.end)
+        if self.background_color:
+            event['backgroundColor'] = self.background_color
+        if self.category:
+            event['eventCategory'] = self.category
+        event['uid'] = self.uid
+        event['fingerprint'] = self.fingerprint
+        return event
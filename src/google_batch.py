@@ -0,0 +1,209 @@
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from googleapiclient.errors import HttpError
+
+BATCH_SIZE = 50  # Google Calendar API limite à 50 requêtes par batch
+# Quota par défaut de l'API Calendar : 600 requêtes par minute et par utilisateur
+DEFAULT_RATE = 10
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_MAX_ROUNDS = 5
+MAX_BACKOFF = 32
+
+RATE_LIMIT_REASONS = (b'rateLimitExceeded', b'userRateLimitExceeded')
+
+def authorized_http_factory(credentials):
+    """
+    Retourne une fonction créant un client HTTP authentifié : httplib2 n'étant pas utilisable
+    depuis plusieurs threads, chaque thread d'envoi a le sien
+    """
+    import httplib2
+    import google_auth_httplib2
+
+    return lambda: google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http())
+
+def is_rate_limited(exception):
+    """
+    Indique si une requête a été refusée pour dépassement du quota par minute (403 ou 429)
+    """
+    if not isinstance(exception, HttpError):
+        return False
+    if exception.resp.status == 429:
+        return True
+    return exception.resp.status == 403 and any(reason in (exception.content or b'') for reason in RATE_LIMIT_REASONS)
+
+def is_retryable(exception):
+    if is_rate_limited(exception):
+        return True
+    if isinstance(exception, HttpError):
+        return exception.resp.status >= 500
+    # Erreur réseau
+    return True
+
+class TokenBucket:
+    """
+    Limiteur de débit : chaque requête consomme un jeton, les jetons se rechargent à `rate` par seconde
+
+    Le débit est divisé par deux après chaque tour refusé pour quota dépassé et remonte
+    progressivement vers sa valeur initiale tant que les lots aboutissent.
+    """
+    def __init__(self, rate, capacity):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, count):
+        count = min(count, self.capacity)
+        while True:
+            with self.lock:
+                self.refill()
+                if self.tokens >= count:
+                    self.tokens -= count
+                    return
+                wait = (count - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def slow_down(self):
+        with self.lock:
+            self.refill()
+            self.rate = max(1, self.rate / 2)
+
+    def speed_up(self):
+        with self.lock:
+            self.refill()
+            self.rate = min(self.max_rate, self.rate * 1.1)
+
+class BatchExecutor:
+    """
+    Envoie des requêtes de l'API Google Calendar par lots, plusieurs lots à la fois
+
+    - au plus max_in_flight lots en cours (CY_GOOGLE_MAX_IN_FLIGHT)
+    - débit limité par un TokenBucket (CY_GOOGLE_RATE requêtes par seconde)
+    - le résultat de chaque requête est relevé : seules les requêtes en échec pour une raison
+      temporaire (quota, erreur serveur ou réseau) sont renvoyées au tour suivant, après une
+      attente exponentielle en cas de quota dépassé
+    """
+    def __init__(self, http_factory=None, max_in_flight=None, rate=None, max_rounds=DEFAULT_MAX_ROUNDS):
+        self.http_factory = http_factory
+        # Sans client HTTP par thread, les lots sont envoyés un par un avec le client du service
+        self.max_in_flight = int(max_in_flight or os.getenv('CY_GOOGLE_MAX_IN_FLIGHT', DEFAULT_MAX_IN_FLIGHT)) if http_factory else 1
+        self.limiter = TokenBucket(float(rate or os.getenv('CY_GOOGLE_RATE', DEFAULT_RATE)), BATCH_SIZE)
+        self.max_rounds = max_rounds
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.succeeded = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.elapsed = 0
+
+    def get_http(self):
+        if self.http_factory is None:
+            return None
+        if not hasattr(self.local, 'http'):
+            self.local.http = self.http_factory()
+        return self.local.http
+
+    def send_batch(self, service, requests, indexes):
+        """
+        Envoie un lot et retourne les erreurs de ses requêtes
+
+        Returns:
+            dict: {index de la requête: exception}
+        """
+        errors = {}
+
+        def callback(request_id, response, exception):
+            if exception is None:
+                return
+            request = requests[int(request_id)][1]
+            # Un événement déjà supprimé n'est pas une erreur
+            if isinstance(exception, HttpError) and exception.resp.status in (404, 410) and request.method == 'DELETE':
+                return
+            errors[int(request_id)] = exception
+
+        self.limiter.acquire(len(indexes))
+        batch = service.new_batch_http_request(callback=callback)
+        for index in indexes:
+            batch.add(requests[index][1], request_id=str(index))
+        try:
+            batch.execute(http=self.get_http())
+        except Exception as e:
+            # Le lot entier a échoué (réseau, quota) : toutes ses requêtes sont à renvoyer
+            return {index: e for index in indexes}
+        return errors
+
+    def execute(self, service, requests):
+        """
+        Args:
+            requests: Liste de tuples (description, requête)
+
+        Returns:
+            list: Descriptions des requêtes restées en échec
+        """
+        start = time.monotonic()
+        pending = list(range(len(requests)))
+        failures = []
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            for round_number in range(1, self.max_rounds + 1):
+                if not pending:
+                    break
+                if round_number > 1:
+                    self.retries += len(pending)
+
+                batches = [pending[i:i + BATCH_SIZE] for i in range(0, len(pending), BATCH_SIZE)]
+                futures = [pool.submit(self.send_batch, service, requests, indexes) for indexes in batches]
+
+                retry = []
+                round_failures = 0
+                rate_limited = False
+                for indexes, future in zip(batches, futures):
+                    errors = future.result()
+                    with self.lock:
+                        self.sent += len(indexes)
+                        self.succeeded += len(indexes) - len(errors)
+                    round_failures += len(errors)
+                    limited = sum(1 for e in errors.values() if is_rate_limited(e))
+                    if limited:
+                        rate_limited = True
+                        self.rate_limited += limited
+                    elif not errors:
+                        self.limiter.speed_up()
+                    for index, exception in errors.items():
+                        if is_retryable(exception) and round_number < self.max_rounds:
+                            retry.append(index)
+                        else:
+                            print(f"✗ Échec ({requests[index][0]}): {exception}")
+                            failures.append(requests[index][0])
+
+                print(f"Progression: {len(pending) - round_failures}/{len(pending)} requêtes abouties (tour {round_number})")
+                pending = sorted(retry)
+                if rate_limited:
+                    # Un seul ralentissement par tour, quel que soit le nombre de lots refusés
+                    self.limiter.slow_down()
+                if pending and rate_limited:
+                    backoff = min(MAX_BACKOFF, 2 ** round_number) + random.random()
+                    print(f"Quota Google dépassé, nouvelle tentative dans {backoff:.0f} secondes "
+                          f"({self.limiter.rate:.1f} requêtes/s)")
+                    time.sleep(backoff)
+
+        self.elapsed += time.monotonic() - start
+        return failures
+
+    def report(self):
+        if not self.sent:
+            return
+        throughput = self.succeeded / self.elapsed if self.elapsed else 0
+        print(f"Google: {self.succeeded} requête(s) abouties en {self.elapsed:.1f} s ({throughput:.1f} événements/s), "
+              f"{self.retries} nouvelle(s) tentative(s), {self.rate_limited} refus pour quota")
@@ -4,7 +4,10 @@ from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from icalendar import Calendar
 from src.google_colors import *
+from src.course_event import CourseEvent
+from src.google_batch import BatchExecutor, authorized_http_factory
 import os.path
+import json
 import pickle
 import glob
 import html
@@ -59,8 +62,15 @@ event_colors = {
 
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 CALENDAR_NAME = "Cours CY"
+
+# Propriétés privées (extendedProperties) des événements créés par CY Calendar
+MANAGED_PROPERTY = 'cyCalendar'
+SOURCE_KEY_PROPERTY = 'cySourceKey'
+FINGERPRINT_PROPERTY = 'cyFingerprint'
 GOOGLE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'google')
 TOKEN_PATH = os.path.join(GOOGLE_DIR, 'token.pickle')
+# Copie locale de l'agenda Google et jeton de synchronisation (syncToken)
+SYNC_STATE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.cache', 'google_sync.json')
 
 def find_credentials_file():
     """
@@ -168,36 +178,67 @@ def update_github_token():
         print(f"⚠️ Impossible de mettre à jour le token GitHub: {e}")
         # Ne pas bloquer le processus principal en cas d'erreur
 
+def find_calendar(service):
+    """
+    Returns:
+        str: ID de l'agenda 'Cours CY', ou None s'il n'existe pas
+    """
+    page_token = None
+    while True:
+        calendar_list = service.calendarList().list(pageToken=page_token).execute()
+        for calendar_list_entry in calendar_list['items']:
+            if calendar_list_entry['summary'] == CALENDAR_NAME:
+                return calendar_list_entry['id']
+        page_token = calendar_list.get('nextPageToken')
+        if not page_token:
+            return None
+
+def create_calendar(service):
+    """
+    Crée l'agenda 'Cours CY' et lui applique sa couleur
+    """
+    print(f"Création d'un nouvel agenda '{CALENDAR_NAME}'...")
+    calendar = {
+        'summary': CALENDAR_NAME,
+        'timeZone': 'Europe/Paris'
+    }
+    created_calendar = service.calendars().insert(body=calendar).execute()
+    
+    # Colorer le calendrier
+    calendar_list_entry = service.calendarList().get(calendarId=created_calendar['id']).execute()
+    # Couleur de l'agenda
+    calendar_list_entry['colorId'] = calendar_colors['Cobalt'] # Bleu
+    service.calendarList().update(calendarId=created_calendar['id'], body=calendar_list_entry).execute()
+    
+    return created_calendar['id']
+
 def find_or_create_calendar(service):
     """
     Cherche l'agenda 'Cours CY', le supprime s'il existe et en crée un nouveau
     """
     try:
-        # Lister tous les calendriers
-        calendar_list = service.calendarList().list().execute()
-        
         # Chercher et supprimer le calendrier 'Cours CY' s'il existe
-        for calendar_list_entry in calendar_list['items']:
-            if (calendar_list_entry['summary'] == CALENDAR_NAME):
-                print(f"Suppression de l'ancien agenda '{CALENDAR_NAME}'...")
-                service.calendars().delete(calendarId=calendar_list_entry['id']).execute()
-                break
+        calendar_id = find_calendar(service)
+        if calendar_id:
+            print(f"Suppression de l'ancien agenda '{CALENDAR_NAME}'...")
+            service.calendars().delete(calendarId=calendar_id).execute()
         
         # Créer un nouveau calendrier
-        print(f"Création d'un nouvel agenda '{CALENDAR_NAME}'...")
-        calendar = {
-            'summary': CALENDAR_NAME,
-            'timeZone': 'Europe/Paris'
-        }
-        created_calendar = service.calendars().insert(body=calendar).execute()
-        
-        # Colorer le calendrier
-        calendar_list_entry = service.calendarList().get(calendarId=created_calendar['id']).execute()
-        # Couleur de l'agenda
-        calendar_list_entry['colorId'] = calendar_colors['Cobalt'] # Bleu
-        service.calendarList().update(calendarId=created_calendar['id'], body=calendar_list_entry).execute()
+        return create_calendar(service)
         
-        return created_calendar['id']
+    except HttpError as error:
+        print(f"Erreur lors de la création du calendrier: {error}")
+        raise
+
+def get_or_create_calendar(service):
+    """
+    Retourne l'agenda 'Cours CY' existant, ou le crée s'il n'existe pas encore
+    """
+    try:
+        calendar_id = find_calendar(service)
+        if calendar_id:
+            return calendar_id
+        return create_calendar(service)
         
     except HttpError as error:
         print(f"Erreur lors de la création du calendrier: {error}")
@@ -240,13 +281,245 @@ def get_event_color(summary):
         return event_colors['Tangerine']  # Orange pour les TP
     return event_colors['Graphite']  # Couleur par défaut
 
-def import_to_google_calendar(ics_file_path, calendar_id=None):
+def read_ics_events(ics_file_path):
+    """
+    Lit les événements d'un fichier ICS
+    
+    Returns:
+        list: Liste de CourseEvent
+    """
+    with open(ics_file_path, 'rb') as f:
+        cal = Calendar.from_ical(f.read())
+    return [CourseEvent.from_ical(component) for component in cal.walk('VEVENT')]
+
+def get_sync_mode():
+    """
+    Mode de synchronisation (variable CY_GOOGLE_SYNC) : 'diff' (par défaut) n'envoie que les
+    créations, modifications et suppressions, 'recreate' recrée l'agenda et tous ses événements
+    """
+    mode = os.getenv('CY_GOOGLE_SYNC', 'diff').lower()
+    return mode if mode in ('diff', 'recreate') else 'diff'
+
+def get_write_mode():
+    """
+    Création des événements (variable CY_GOOGLE_WRITE) : 'import' (par défaut) utilise
+    events().import_ avec l'UID de l'événement comme iCalUID, ce qui permet de renvoyer une
+    requête sans créer de doublon ; 'insert' utilise events().insert
+    """
+    mode = os.getenv('CY_GOOGLE_WRITE', 'import').lower()
+    return mode if mode in ('import', 'insert') else 'import'
+
+def create_event_request(service, calendar_id, course, body):
+    """
+    Requête de création d'un événement, selon get_write_mode
+    """
+    if get_write_mode() == 'import':
+        # Un événement de même iCalUID déjà présent est mis à jour au lieu d'être dupliqué
+        return service.events().import_(calendarId=calendar_id, body=dict(body, iCalUID=course.uid))
+    return service.events().insert(calendarId=calendar_id, body=body)
+
+def load_sync_state(calendar_id):
+    """
+    Charge la copie locale de l'agenda enregistrée lors de la synchronisation précédente
+    
+    Returns:
+        dict: {'calendar_id', 'sync_token', 'events': {ID Google: [clé source, empreinte]}},
+            ou None si elle n'existe pas ou concerne un autre agenda
+    """
+    if not os.path.exists(SYNC_STATE_PATH):
+        return None
+    try:
+        with open(SYNC_STATE_PATH, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Copie locale de l'agenda illisible, liste complète: {e}")
+        return None
+    if state.get('calendar_id') != calendar_id or not state.get('sync_token'):
+        return None
+    return state
+
+def save_sync_state(state):
+    try:
+        os.makedirs(os.path.dirname(SYNC_STATE_PATH), exist_ok=True)
+        with open(SYNC_STATE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+    except OSError as e:
+        print(f"⚠️ Impossible de sauvegarder la copie locale de l'agenda: {e}")
+
+def list_events(service, calendar_id, sync_token=None):
+    """
+    Liste les événements de l'agenda, ou seulement ceux modifiés depuis sync_token
+    
+    Returns:
+        tuple: (événements, nouveau jeton de synchronisation)
+    
+    Raises:
+        HttpError: 410 si le jeton de synchronisation a expiré
+    """
+    items = []
+    page_token = None
+    while True:
+        params = {
+            'calendarId': calendar_id,
+            'maxResults': 2500,
+            'pageToken': page_token,
+            'fields': 'nextPageToken,nextSyncToken,items(id,status,extendedProperties/private)',
+        }
+        if sync_token:
+            params['syncToken'] = sync_token
+        response = service.events().list(**params).execute()
+        items.extend(response.get('items', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return items, response.get('nextSyncToken')
+
+def mirror_entry(item):
+    """
+    Returns:
+        list: [clé source, empreinte] d'un événement Google ([None, None] s'il n'a pas été créé par CY Calendar)
+    """
+    private = item.get('extendedProperties', {}).get('private', {})
+    if private.get(MANAGED_PROPERTY) != '1':
+        return [None, None]
+    return [private.get(SOURCE_KEY_PROPERTY), private.get(FINGERPRINT_PROPERTY)]
+
+def fetch_remote_state(service, calendar_id):
+    """
+    Met à jour la copie locale de l'agenda Google
+    
+    Seules les modifications depuis la synchronisation précédente sont demandées (syncToken).
+    Une liste complète n'est faite que la première fois ou lorsque le jeton a expiré (410 Gone).
+    
+    Returns:
+        dict: La copie locale à jour (voir load_sync_state)
+    """
+    state = load_sync_state(calendar_id)
+    if state:
+        try:
+            items, sync_token = list_events(service, calendar_id, state['sync_token'])
+            for item in items:
+                if item.get('status') == 'cancelled':
+                    state['events'].pop(item['id'], None)
+                else:
+                    state['events'][item['id']] = mirror_entry(item)
+            state['sync_token'] = sync_token
+            print(f"{len(items)} modification(s) de l'agenda Google depuis la dernière synchronisation")
+        except HttpError as error:
+            if error.resp.status != 410:
+                raise
+            print("Jeton de synchronisation expiré, liste complète de l'agenda")
+            state = None
+    
+    if not state:
+        items, sync_token = list_events(service, calendar_id)
+        state = {
+            'calendar_id': calendar_id,
+            'sync_token': sync_token,
+            'events': {item['id']: mirror_entry(item) for item in items if item.get('status') != 'cancelled'},
+        }
+        print(f"{len(state['events'])} événement(s) dans l'agenda Google")
+    
+    save_sync_state(state)
+    return state
+
+def get_managed_events(state):
+    """
+    Returns:
+        dict: {clé source: [(ID Google, empreinte), ...]} des événements créés par CY Calendar
+    """
+    remote = {}
+    for event_id, (key, fingerprint) in state['events'].items():
+        if key:
+            remote.setdefault(key, []).append((event_id, fingerprint))
+    return remote
+
+def insert_all_events(service, calendar_id, events, executor):
     """
-    Importe les événements d'un fichier ICS dans Google Calendar avec des opérations batch
+    Insère tous les événements dans l'agenda (mode 'recreate')
+    """
+    print(f"Import des événements dans l'agenda '{CALENDAR_NAME}'...")
+    requests = []
+    for course in events:
+        try:
+            requests.append((f"création {course.uid}", create_event_request(service, calendar_id, course, course.to_google_body())))
+        except Exception as e:
+            print(f"Erreur lors de l'import d'un événement: {e}")
+            continue
+    
+    failures = executor.execute(service, requests)
+    print(f"Import terminé! {len(requests) - len(failures)} événements importés dans l'agenda '{CALENDAR_NAME}'")
+    return not failures
+
+def sync_events(service, calendar_id, events, executor):
+    """
+    Synchronise l'agenda par différence (mode 'diff')
+    
+    Les événements existants sont reconnus par leur clé source (UID déterministe) et leur
+    empreinte : seuls les événements nouveaux, modifiés ou disparus donnent lieu à une requête.
+    L'état de l'agenda vient de la copie locale, mise à jour par fetch_remote_state.
+    """
+    first_sync = load_sync_state(calendar_id) is None
+    state = fetch_remote_state(service, calendar_id)
+    remote = get_managed_events(state)
+    if first_sync and not remote and state['events']:
+        # Agenda rempli par l'ancien mode de synchronisation, qui le recréait à chaque exécution :
+        # il est recréé une dernière fois. Ensuite, les événements ajoutés à la main ne sont
+        # plus jamais supprimés
+        print("Agenda créé par une version précédente, recréation complète")
+        calendar_id = find_or_create_calendar(service)
+    
+    creates, updates, deletes = [], [], []
+    unchanged = 0
+    for course in events:
+        entries = remote.pop(course.uid, [])
+        # Doublons éventuels d'un même événement
+        for event_id, _ in entries[1:]:
+            deletes.append((f"suppression {course.uid}", service.events().delete(calendarId=calendar_id, eventId=event_id)))
+        
+        if entries and entries[0][1] == course.fingerprint:
+            unchanged += 1
+            continue
+        
+        try:
+            body = course.to_google_body()
+        except Exception as e:
+            print(f"Erreur lors de l'import d'un événement: {e}")
+            continue
+        
+        if entries:
+            updates.append((f"mise à jour {course.uid}", service.events().update(calendarId=calendar_id, eventId=entries[0][0], body=body)))
+        else:
+            creates.append((f"création {course.uid}", create_event_request(service, calendar_id, course, body)))
+    
+    # Événements qui ne sont plus dans l'emploi du temps
+    for key, entries in remote.items():
+        for event_id, _ in entries:
+            deletes.append((f"suppression {key}", service.events().delete(calendarId=calendar_id, eventId=event_id)))
+    
+    print(f"Synchronisation de l'agenda '{CALENDAR_NAME}': {len(creates)} création(s), {len(updates)} mise(s) à jour, "
+          f"{len(deletes)} suppression(s), {unchanged} événement(s) inchangé(s)")
+    
+    failures = executor.execute(service, creates + updates + deletes)
+    if failures:
+        print(f"✗ {len(failures)} requête(s) en échec")
+        return False
+    
+    print(f"✓ Agenda '{CALENDAR_NAME}' à jour")
+    return True
+
+def import_to_google_calendar(ics_file_path=None, calendar_id=None, events=None, resume=False):
+    """
+    Importe les événements dans Google Calendar avec des opérations batch
+    
+    Par défaut seules les différences avec l'agenda existant sont envoyées (voir get_sync_mode).
     
     Args:
-        ics_file_path (str): Chemin vers le fichier ICS à importer
+        ics_file_path (str, optional): Chemin vers le fichier ICS à importer
         calendar_id (str, optional): ID du calendrier existant où importer les événements
+        events (list, optional): CourseEvent déjà convertis, importés directement sans relire
+            le fichier ICS
+        resume (bool, optional): Nouvelle tentative après un import interrompu : l'agenda n'est
+            pas recréé, seuls les événements manquants ou différents sont envoyés
         
     Returns:
         bool: True si l'import a réussi, False sinon
@@ -259,78 +532,27 @@ def import_to_google_calendar(ics_file_path, calendar_id=None):
             
         service = build('calendar', 'v3', credentials=creds)
         
-        # Créer un nouveau calendrier (l'ancien est automatiquement supprimé)
-        calendar_id = find_or_create_calendar(service)
+        # Lecture du fichier ICS, sauf si les événements sont transmis directement
+        if events is None:
+            events = read_ics_events(ics_file_path)
         
-        # Lecture du fichier ICS
-        with open(ics_file_path, 'rb') as f:
-            cal = Calendar.from_ical(f.read())
-            
-        print(f"Import des événements dans l'agenda '{CALENDAR_NAME}'...")
-        events_count = 0
-        batch_size = 50  # Google Calendar API limite à 50 requêtes par batch
-        events_batch = []
+        # Lots envoyés en parallèle, chacun avec son propre client HTTP
+        executor = BatchExecutor(authorized_http_factory(creds))
         
-        # Préparer les événements par lots
-        for component in cal.walk('VEVENT'):
-            try:
-                # Nettoyer le titre de l'événement et décoder les entités HTML
-                summary = str(component.get('summary'))
-                cleaned_summary = clean_event_summary(summary)
-                cleaned_summary = decode_html_entities(cleaned_summary)
-                
-                # Décoder aussi la description et le lieu
-                location = decode_html_entities(str(component.get('location', '')))
-                description = decode_html_entities(str(component.get('description', '')))
-                
-                event = {
-                    'summary': cleaned_summary,
-                    'location': location,
-                    'description': description,
-                    'start': {
-                        'dateTime': component.get('dtstart').dt.isoformat(),
-                        'timeZone': 'Europe/Paris',
-                    },
-                    'end': {
-                        'dateTime': component.get('dtend').dt.isoformat(),
-                        'timeZone': 'Europe/Paris',
-                    }
-                }
-                
-                # Définir la couleur selon le type d'événement
-                color_id = get_event_color(cleaned_summary)
-                if color_id:
-                    event['colorId'] = color_id
-                
-                events_batch.append(event)
-                events_count += 1
-                
-                # Traiter le lot quand il atteint la taille maximale
-                if len(events_batch) >= batch_size:
-                    batch = service.new_batch_http_request()
-                    for evt in events_batch:
-                        batch.add(service.events().insert(calendarId=calendar_id, body=evt))
-                    batch.execute()
-                    print(f"Progression: {events_count} événements importés...")
-                    events_batch = []
-                
-            except Exception as e:
-                print(f"Erreur lors de l'import d'un événement: {e}")
-                continue
+        if get_sync_mode() == 'recreate' and not resume:
+            # Créer un nouveau calendrier (l'ancien est automatiquement supprimé)
+            calendar_id = find_or_create_calendar(service)
+            result = insert_all_events(service, calendar_id, events, executor)
+        else:
+            calendar_id = calendar_id or get_or_create_calendar(service)
+            result = sync_events(service, calendar_id, events, executor)
         
-        # Traiter le dernier lot s'il reste des événements
-        if events_batch:
-            batch = service.new_batch_http_request()
-            for evt in events_batch:
-                batch.add(service.events().insert(calendarId=calendar_id, body=evt))
-            batch.execute()
-            
-        print(f"Import terminé avec succès! {events_count} événements importés dans l'agenda '{CALENDAR_NAME}'")
-        return True
+        executor.report()
+        return result
         
     except Exception as e:
         print(f"Erreur lors de l'import: {str(e)}")
         print("\nSi vous voyez une erreur d'accès refusé:")
         print("Votre limite doit etre dépassée. Attendez quelques minutes et réessayez.")
         print("Si le problème persiste, contactez le développeur.")
-        return False
\ No newline at end of file
+        return False
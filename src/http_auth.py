@@ -0,0 +1,140 @@
+import re
+from urllib.parse import urljoin
+import requests
+from bs4 import BeautifulSoup
+from src.calendar_converter import create_session
+
+BASE_URL = 'https://services-web.cyu.fr/calendar/'
+LOGIN_URL = 'https://services-web.cyu.fr/calendar/LdapLogin'
+CALENDAR_COOKIE_NAME = '.Calendar.Cookies'
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'fr-FR,fr;q=0.9,en;q=0.8',
+}
+
+def find_login_form(soup):
+    """
+    Trouve le formulaire de connexion (celui qui contient le champ 'Password')
+    """
+    for form in soup.find_all('form'):
+        if form.find('input', attrs={'name': 'Password'}):
+            return form
+    return None
+
+def extract_form_fields(form):
+    """
+    Récupère les champs cachés du formulaire (jetons anti-forgery, URL de retour...)
+    """
+    fields = {}
+    for field in form.find_all('input'):
+        name = field.get('name')
+        if not name:
+            continue
+        if field.get('type', 'text').lower() in ('checkbox', 'radio') and not field.has_attr('checked'):
+            continue
+        fields[name] = field.get('value', '')
+    return fields
+
+def extract_student_number(response):
+    """
+    Cherche le paramètre fid0= dans l'URL finale, les redirections puis le contenu de la page
+    """
+    urls = [response.url]
+    for previous in response.history:
+        urls.append(previous.url)
+        urls.append(previous.headers.get('Location', ''))
+
+    for url in urls:
+        match = re.search(r'fid0=(\d+)', url or '')
+        if match:
+            return match.group(1)
+
+    match = re.search(r'fid0=(\d+)', response.text)
+    return match.group(1) if match else None
+
+def extract_calendar_cookie(session):
+    """
+    Retourne le cookie .Calendar.Cookies au même format que Selenium
+    """
+    for cookie in session.cookies:
+        if cookie.name == CALENDAR_COOKIE_NAME:
+            calendar_cookie = {
+                'name': cookie.name,
+                'value': cookie.value,
+                'domain': cookie.domain,
+                'path': cookie.path,
+            }
+            if cookie.expires:
+                calendar_cookie['expiry'] = cookie.expires
+            return calendar_cookie
+    return None
+
+def http_login(username, password):
+    """
+    Se connecte au portail CY sans navigateur, en soumettant directement le formulaire LdapLogin
+
+    Args:
+        username: Identifiant CY
+        password: Mot de passe CY
+
+    Returns:
+        tuple: (cookie, student_number) ou (None, None) en cas d'échec
+    """
+    session = create_session()
+    session.headers.update(HEADERS)
+
+    try:
+        print("Connexion HTTP au portail CY...")
+        response = session.get(LOGIN_URL, timeout=(5, 15))
+        response.raise_for_status()
+
+        form = find_login_form(BeautifulSoup(response.text, 'html.parser'))
+        if not form:
+            print("✗ Formulaire de connexion introuvable sur la page LdapLogin")
+            return None, None
+
+        fields = extract_form_fields(form)
+        fields['Name'] = username
+        fields['Password'] = password
+
+        action_url = urljoin(response.url, form.get('action') or response.url)
+        print("Soumission du formulaire...")
+        response = session.post(
+            action_url,
+            data=fields,
+            headers={'Referer': response.url, 'Origin': 'https://services-web.cyu.fr'},
+            timeout=(5, 20)
+        )
+        response.raise_for_status()
+
+        # Le formulaire réaffiché signifie que les identifiants ont été refusés
+        if find_login_form(BeautifulSoup(response.text, 'html.parser')):
+            print("✗ Identifiants refusés par le portail CY")
+            return None, None
+
+        calendar_cookie = extract_calendar_cookie(session)
+        if not calendar_cookie:
+            print("✗ Cookie .Calendar.Cookies non reçu après la connexion")
+            return None, None
+
+        student_number = extract_student_number(response)
+        if not student_number:
+            # La page d'accueil redirige vers le calendrier de l'étudiant connecté
+            response = session.get(BASE_URL, timeout=(5, 15))
+            student_number = extract_student_number(response)
+
+        if not student_number:
+            print("✗ Numéro étudiant introuvable après la connexion")
+            print(f"URL actuelle: {response.url}")
+            return None, None
+
+        print(f"✓ Connexion HTTP réussie (numéro étudiant: {student_number})")
+        return calendar_cookie, student_number
+
+    except requests.exceptions.RequestException as e:
+        print(f"✗ Erreur lors de la connexion HTTP: {e}")
+        return None, None
+    finally:
+        session.close()
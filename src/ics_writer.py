@@ -0,0 +1,82 @@
+# Longueur maximale d'une ligne de contenu, en octets, hors CRLF (RFC 5545, section 3.1)
+MAX_LINE_OCTETS = 75
+TIMEZONE = 'Europe/Paris'
+
+ICS_HEADER = "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//CY University Calendar//FR\r\n"
+ICS_FOOTER = "END:VCALENDAR\r\n"
+
+def escape_ical_chars(text):
+    """
+    Échappe correctement les caractères spéciaux pour le format iCalendar selon RFC 5545
+    """
+    if not text:
+        return ""
+
+    # Échappe les caractères spéciaux dans l'ordre correct
+    text = text.replace('\\', '\\\\')  # Backslash doit être échappé en premier
+    text = text.replace(';', '\\;')    # Point-virgule
+    text = text.replace(',', '\\,')    # Virgule
+    text = text.replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n')  # Sauts de ligne
+
+    return text
+
+def fold_line(line):
+    """
+    Coupe une ligne de contenu en lignes de 75 octets au plus, sans couper de caractère UTF-8
+
+    Les lignes de continuation commencent par une espace, qui compte dans leur longueur.
+    """
+    if len(line) <= MAX_LINE_OCTETS // 4 or len(line.encode('utf-8')) <= MAX_LINE_OCTETS:
+        return line
+
+    folded = []
+    current = []
+    size = 0
+    for char in line:
+        char_size = len(char.encode('utf-8'))
+        if size + char_size > MAX_LINE_OCTETS:
+            folded.append(''.join(current))
+            current = [' ']
+            size = 1
+        current.append(char)
+        size += char_size
+    folded.append(''.join(current))
+    return '\r\n'.join(folded)
+
+def format_datetime(value):
+    """
+    Date et heure locales de Paris, au format DATE-TIME de RFC 5545
+    """
+    return value.strftime('%Y%m%dT%H%M%S')
+
+def text_property(name, value):
+    return fold_line(f"{name}:{escape_ical_chars(value)}") + "\r\n"
+
+def format_vevent(course, uid=None):
+    """
+    Écrit le VEVENT d'un CourseEvent
+
+    Args:
+        course: CourseEvent à écrire
+        uid: UID à utiliser à la place de course.uid
+
+    Les propriétés sont dans le même ordre que celui produit par icalendar.
+
+    Returns:
+        str: Le bloc BEGIN:VEVENT ... END:VEVENT, lignes terminées par CRLF
+    """
+    parts = [
+        "BEGIN:VEVENT\r\n",
+        text_property("SUMMARY", course.summary),
+        f"DTSTART;TZID={TIMEZONE}:{format_datetime(course.start)}\r\n",
+        f"DTEND;TZID={TIMEZONE}:{format_datetime(course.end)}\r\n",
+        text_property("UID", uid or course.uid),
+        text_property("DESCRIPTION", course.description),
+        text_property("LOCATION", course.location),
+        text_property("X-CYCALENDAR-FINGERPRINT", course.fingerprint),
+        text_property("X-EVENT-TYPE", course.category),
+    ]
+    if course.background_color is not None:
+        parts.append(text_property("X-ORIGINAL-BG-COLOR", course.background_color))
+    parts.append("END:VEVENT\r\n")
+    return ''.join(parts)
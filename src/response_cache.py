@@ -0,0 +1,196 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import threading
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.cache', 'responses')
+# Plage de dates de chaque entrée, pour retrouver une réponse en mode hors ligne
+INDEX_PATH = os.path.join(CACHE_DIR, 'index.json')
+
+# Durée de validité d'une réponse (secondes) et taille maximale du cache (Mo)
+DEFAULT_TTL = 1800
+DEFAULT_MAX_SIZE_MB = 50
+
+_index_lock = threading.Lock()
+
+def is_cache_enabled():
+    """
+    Indique si le cache des réponses est activé (variable CY_RESPONSE_CACHE, activé par défaut)
+    """
+    return os.getenv('CY_RESPONSE_CACHE', 'true').lower() == 'true' or is_offline()
+
+def is_offline():
+    """
+    En mode hors ligne (CY_OFFLINE=true), les données ne proviennent que du cache
+    """
+    return os.getenv('CY_OFFLINE', 'false').lower() == 'true'
+
+def make_key(student_number, start_date_str, end_date_str, res_type, colour_scheme):
+    """
+    Clé de cache d'une requête GetCalendarData
+    """
+    student_numbers = student_number if isinstance(student_number, (list, tuple)) else [student_number]
+    raw_key = json.dumps([[str(number) for number in student_numbers], start_date_str, end_date_str,
+                          str(res_type), str(colour_scheme)])
+    return hashlib.sha256(raw_key.encode('utf-8')).hexdigest()
+
+def make_resource_key(student_number, res_type, colour_scheme):
+    """
+    Identifiant de la ressource demandée, indépendamment de la plage de dates
+    """
+    student_numbers = student_number if isinstance(student_number, (list, tuple)) else [student_number]
+    return json.dumps([[str(number) for number in student_numbers], str(res_type), str(colour_scheme)])
+
+def get_cache_path(key):
+    return os.path.join(CACHE_DIR, f'{key}.json.gz')
+
+def get_cached_response(key):
+    """
+    Returns:
+        La réponse décodée si elle est en cache et encore valide (toujours en mode hors ligne),
+        None sinon
+    """
+    if not is_cache_enabled():
+        return None
+
+    path = get_cache_path(key)
+    try:
+        age = time.time() - os.path.getmtime(path)
+    except OSError:
+        return None
+
+    ttl = float(os.getenv('CY_CACHE_TTL', DEFAULT_TTL))
+    if age > ttl and not is_offline():
+        return None
+
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Entrée de cache illisible, elle sera ignorée: {e}")
+        return None
+
+def store_response(key, data, resource=None, start_date_str=None, end_date_str=None):
+    """
+    Enregistre une réponse compressée puis applique la limite de taille du cache
+
+    Args:
+        resource: Ressource demandée (make_resource_key) ; avec la plage de dates, elle est
+            notée dans l'index utilisé par find_offline_response
+    """
+    if not is_cache_enabled():
+        return
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = get_cache_path(key)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+        if resource is not None:
+            update_index(key, {'resource': resource, 'start': start_date_str, 'end': end_date_str})
+        evict()
+    except OSError as e:
+        print(f"⚠️ Impossible d'enregistrer la réponse en cache: {e}")
+
+def load_index():
+    try:
+        with open(INDEX_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def update_index(key, entry):
+    """
+    Ajoute une entrée à l'index et en retire celles dont le fichier a été supprimé
+    """
+    with _index_lock:
+        index = {cached_key: cached_entry for cached_key, cached_entry in load_index().items()
+                 if os.path.exists(get_cache_path(cached_key))}
+        index[key] = entry
+        temp_path = f'{INDEX_PATH}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(temp_path, INDEX_PATH)
+
+def find_offline_response(resource, start_date_str, end_date_str):
+    """
+    Cherche en mode hors ligne une réponse de la ressource couvrant la plage demandée
+
+    Les plages calculées ('year', fenêtres, récupération incrémentale) dépendent de la date du
+    jour : sans ce repli, une réponse ne serait retrouvée que le jour où elle a été enregistrée.
+    La réponse la plus récente couvrant toute la plage est préférée ; à défaut, celle couvrant
+    son début est utilisée, avec un avertissement sur les jours manquants.
+
+    Returns:
+        list: Les événements en cache compris dans la plage demandée, ou None
+    """
+    candidates = []
+    for key, entry in load_index().items():
+        if entry.get('resource') != resource:
+            continue
+        if not (entry.get('start') or '') <= start_date_str <= (entry.get('end') or ''):
+            continue
+        try:
+            saved_at = os.path.getmtime(get_cache_path(key))
+        except OSError:
+            continue
+        covers_range = entry['end'] >= end_date_str
+        candidates.append((covers_range, saved_at, key, entry))
+
+    for covers_range, saved_at, key, entry in sorted(candidates, reverse=True):
+        try:
+            with gzip.open(get_cache_path(key), 'rt', encoding='utf-8') as f:
+                events = json.load(f)
+        except (OSError, ValueError):
+            continue
+        saved_on = time.strftime('%Y-%m-%d %H:%M', time.localtime(saved_at))
+        print(f"Hors ligne: réponse du {saved_on} utilisée pour {start_date_str} → {end_date_str} "
+              f"(plage en cache {entry['start']} → {entry['end']})")
+        if not covers_range:
+            print(f"⚠️ Calendrier incomplet: aucun événement en cache après le {entry['end']}")
+        return [event for event in events
+                if not event.get('start') or start_date_str <= event['start'][:10] <= end_date_str]
+    return None
+
+def evict(max_size_mb=None):
+    """
+    Supprime les entrées les plus anciennes jusqu'à repasser sous la taille maximale
+    """
+    max_size = float(max_size_mb or os.getenv('CY_CACHE_MAX_MB', DEFAULT_MAX_SIZE_MB)) * 1024 * 1024
+
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith('.json.gz'):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= max_size:
+            break
+        try:
+            os.remove(path)
+            total_size -= size
+        except OSError:
+            pass
+
+def clear_cache():
+    """
+    Supprime toutes les réponses en cache
+    """
+    if not os.path.isdir(CACHE_DIR):
+        return
+    for name in os.listdir(CACHE_DIR):
+        try:
+            os.remove(os.path.join(CACHE_DIR, name))
+        except OSError:
+            pass
@@ -0,0 +1,160 @@
+import os
+import json
+import time
+from datetime import datetime
+import requests
+from src.calendar_converter import CALENDAR_DATA_URL, build_calendar_request, get_shared_session
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.cache')
+SESSION_PATH = os.path.join(CACHE_DIR, 'session.json')
+
+# Durée de vie maximale d'une session sans date d'expiration (cookie de session)
+DEFAULT_MAX_AGE_HOURS = 12
+
+def is_session_cache_enabled():
+    """
+    Indique si le cache de session est activé (variable CY_SESSION_CACHE, activé par défaut)
+    """
+    return os.getenv('CY_SESSION_CACHE', 'true').lower() == 'true'
+
+def save_session(cookie, student_number):
+    """
+    Sauvegarde le cookie .Calendar.Cookies et le numéro étudiant sur le disque
+
+    Args:
+        cookie: Cookie d'authentification (dictionnaire au format Selenium)
+        student_number: Numéro étudiant (paramètre fid0)
+    """
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        session_data = {
+            'cookie': {
+                'name': cookie['name'],
+                'value': cookie['value'],
+                'expiry': cookie.get('expiry'),
+            },
+            'student_number': str(student_number),
+            'saved_at': time.time(),
+        }
+
+        # Le fichier contient un cookie d'authentification : accès réservé au propriétaire
+        fd = os.open(SESSION_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(session_data, f)
+        print(f"Session sauvegardée dans {SESSION_PATH}")
+    except Exception as e:
+        print(f"⚠️ Impossible de sauvegarder la session: {e}")
+
+def clear_session():
+    """
+    Supprime la session sauvegardée
+    """
+    try:
+        if os.path.exists(SESSION_PATH):
+            os.remove(SESSION_PATH)
+    except OSError as e:
+        print(f"⚠️ Impossible de supprimer la session: {e}")
+
+def load_session(check_expiry=True):
+    """
+    Charge la session sauvegardée si elle n'a pas expiré
+
+    Args:
+        check_expiry: Si False, retourne la session même expirée (mode hors ligne)
+
+    Returns:
+        tuple: (cookie, student_number) ou (None, None) si aucune session exploitable
+    """
+    if not os.path.exists(SESSION_PATH):
+        return None, None
+
+    try:
+        with open(SESSION_PATH, 'r') as f:
+            session_data = json.load(f)
+
+        cookie = session_data['cookie']
+        student_number = session_data['student_number']
+        saved_at = session_data.get('saved_at', 0)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Session sauvegardée illisible, elle sera ignorée: {e}")
+        clear_session()
+        return None, None
+
+    if not check_expiry:
+        return cookie, student_number
+
+    now = time.time()
+    expiry = cookie.get('expiry')
+    if expiry:
+        if expiry <= now:
+            print(f"Session sauvegardée expirée depuis le {datetime.fromtimestamp(expiry).strftime('%Y-%m-%d %H:%M')}")
+            clear_session()
+            return None, None
+    else:
+        max_age = float(os.getenv('CY_SESSION_MAX_AGE_HOURS', DEFAULT_MAX_AGE_HOURS)) * 3600
+        if now - saved_at > max_age:
+            print("Session sauvegardée trop ancienne")
+            clear_session()
+            return None, None
+
+    return cookie, student_number
+
+def validate_session(cookie, student_number):
+    """
+    Vérifie par une requête légère sur GetCalendarData que le cookie est toujours accepté
+
+    Returns:
+        bool: True si le serveur répond avec des données JSON, False sinon
+    """
+    today = datetime.now().strftime('%Y-%m-%d')
+    payload, headers = build_calendar_request(student_number, today, today)
+
+    # Le client partagé garde la connexion ouverte pour la récupération du calendrier qui suit
+    session = get_shared_session()
+    try:
+        # Une session expirée est redirigée vers la page de connexion : on ne suit pas la redirection
+        response = session.post(
+            CALENDAR_DATA_URL,
+            headers=headers,
+            data=payload,
+            cookies={cookie['name']: cookie['value']},
+            timeout=(5, 10),
+            allow_redirects=False
+        )
+        if response.status_code != 200:
+            print(f"Session refusée par le serveur (HTTP {response.status_code})")
+            return False
+
+        if not isinstance(response.json(), list):
+            print("Réponse inattendue lors de la vérification de la session")
+            return False
+
+        return True
+    except ValueError:
+        print("La vérification de la session n'a pas renvoyé de JSON")
+        return False
+    except requests.exceptions.RequestException as e:
+        print(f"Erreur lors de la vérification de la session: {e}")
+        return False
+
+def get_cached_auth_info():
+    """
+    Récupère une session sauvegardée et encore valide
+
+    Returns:
+        tuple: (cookie, student_number) ou (None, None) si l'authentification complète est nécessaire
+    """
+    if not is_session_cache_enabled():
+        return None, None
+
+    cookie, student_number = load_session()
+    if not cookie:
+        return None, None
+
+    print("Vérification de la session sauvegardée...")
+    if not validate_session(cookie, student_number):
+        clear_session()
+        return None, None
+
+    print(f"✓ Session sauvegardée valide (numéro étudiant: {student_number})")
+    return cookie, student_number
@@ -0,0 +1,38 @@
+import json
+import time
+from contextlib import contextmanager
+
+class PhaseTimer:
+    """
+    Mesure la durée des différentes phases d'une étape (authentification, récupération...)
+    """
+    def __init__(self, name):
+        self.name = name
+        self.phases = []
+
+    @contextmanager
+    def phase(self, phase_name):
+        """
+        Chronomètre le bloc de code exécuté dans le contexte
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((phase_name, time.perf_counter() - start))
+
+    def as_dict(self):
+        """
+        Retourne la durée cumulée de chaque phase (en secondes) et la durée totale
+        """
+        durations = {}
+        for phase_name, duration in self.phases:
+            durations[phase_name] = round(durations.get(phase_name, 0.0) + duration, 3)
+        durations['total'] = round(sum(duration for _, duration in self.phases), 3)
+        return durations
+
+    def report(self):
+        """
+        Affiche les durées sous forme JSON sur une seule ligne (facile à extraire des logs)
+        """
+        print(f"Durées {self.name}: {json.dumps(self.as_dict())}")